@@ -6,3 +6,16 @@ def csv_to_list(value):
     :rtype: List[str]
     """
     return list(filter(None, [x.strip() for x in value.split(',')]))
+
+
+def csv_to_dict(value):
+    """
+    Converts the given value to a dictionary. The value can be either a mapping, which is returned as a dict, or a
+    string of comma-separated 'key=value' pairs.
+    :param dict|str value: the value to convert.
+    :return: a dictionary.
+    :rtype: dict[str, str]
+    """
+    if hasattr(value, 'items'):
+        return dict(value)
+    return dict(tuple(x.strip() for x in item.split('=', 1)) for item in csv_to_list(value) if '=' in item)
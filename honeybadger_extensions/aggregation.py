@@ -0,0 +1,194 @@
+"""
+Aggregation of error storms. The first occurrence of an error in a window is reported as usual; further occurrences
+are only counted, and summarized in a single notice when the window closes.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_GROUPS = 256
+DEFAULT_MAX_OPERATIONS = 20
+
+
+class _Group(object):
+    __slots__ = ('count', 'first', 'last', 'operations', 'sample', 'suppressed')
+
+    def __init__(self, now, operation):
+        self.count = 1
+        self.first = now
+        self.last = now
+        self.operations = {operation} if operation is not None else set()
+        self.sample = None
+        self.suppressed = False
+
+
+def _isoformat(timestamp):
+    return datetime.utcfromtimestamp(timestamp).isoformat() + 'Z'
+
+
+class ErrorAggregator(object):
+    """
+    Counts occurrences of errors, grouped by fingerprint, during fixed windows. Recording an occurrence is O(1) and
+    state is bounded: at most max_groups groups are tracked per window, each keeping at most max_operations
+    endpoints or tasks. Errors that do not fit are not aggregated, i.e. they are reported as usual.
+
+    Windows are closed by a single daemon thread, started on first use, which passes summary notices to the emit
+    callable. It sleeps while no window is open.
+    """
+    def __init__(self, window, emit, max_groups=DEFAULT_MAX_GROUPS, max_operations=DEFAULT_MAX_OPERATIONS):
+        """
+        Initialize aggregator.
+        :param float window: duration of windows, in seconds.
+        :param callable emit: called with each summary notice.
+        :param int max_groups: maximum number of error groups tracked per window.
+        :param int max_operations: maximum number of endpoints or tasks kept per group.
+        """
+        self.window = window
+        self.emit = emit
+        self.max_groups = max_groups
+        self.max_operations = max_operations
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._window_end = None
+        self._flusher = None
+
+    def record(self, fingerprint, operation=None):
+        """
+        Records an occurrence of an error.
+        :param int fingerprint: the fingerprint of the error.
+        :param str operation: the endpoint or task the error occurred in, if known.
+        :return: True if the occurrence was aggregated and should not be reported, False if it should be reported,
+        i.e. it is the first occurrence of the error in the window or the aggregator is full.
+        :rtype: bool
+        """
+        now = time.time()
+        with self._lock:
+            group = self._groups.get(fingerprint)
+            if group is None:
+                if len(self._groups) >= self.max_groups:
+                    return False
+                self._groups[fingerprint] = _Group(now, operation)
+                self._schedule()
+                return False
+            group.count += 1
+            group.last = now
+            if operation is not None and len(group.operations) < self.max_operations:
+                group.operations.add(operation)
+            return True
+
+    def set_sample(self, fingerprint, notice):
+        """
+        Keeps the notice reported for the first occurrence of an error, used as the base of its summary.
+        :param int fingerprint: the fingerprint of the error.
+        :param honeybadger_extensions.notice.Notice notice: the reported notice.
+        """
+        group = self._groups.get(fingerprint)
+        if group is not None and group.sample is None:
+            group.sample = notice
+
+    def suppress(self, fingerprint, notice):
+        """
+        Keeps aggregating an error whose first occurrence in the window was not reported, e.g. because another process
+        already reported it. Its summary is still emitted, so occurrences of this process are not lost.
+        :param int fingerprint: the fingerprint of the error.
+        :param honeybadger_extensions.notice.Notice notice: the notice the summary is based on.
+        """
+        group = self._groups.get(fingerprint)
+        if group is not None:
+            group.suppressed = True
+            if group.sample is None:
+                group.sample = notice
+
+    def discard(self, fingerprint):
+        """
+        Stops aggregating an error in current window, e.g. because its first occurrence was not reported.
+        :param int fingerprint: the fingerprint of the error.
+        """
+        with self._lock:
+            self._groups.pop(fingerprint, None)
+
+    def _schedule(self):
+        # Called with the lock held, whenever a group is created.
+        if self._window_end is not None:
+            return
+        self._window_end = time.monotonic() + self.window
+        if self._flusher is None or not self._flusher.is_alive():
+            # Not started yet, closed, or started by the parent of a forked process.
+            self._flusher = threading.Thread(target=self._run, name='honeybadger-aggregation')
+            self._flusher.daemon = True
+            self._flusher.start()
+        else:
+            self._wakeup.notify_all()
+
+    def _run(self):
+        current = threading.current_thread()
+        while True:
+            with self._lock:
+                while True:
+                    if self._flusher is not current:
+                        return
+                    timeout = None
+                    if self._window_end is not None:
+                        timeout = self._window_end - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    self._wakeup.wait(timeout)
+            self.flush()
+
+    def summarize(self, group):
+        """
+        Creates the summary notice of a group, from its sample.
+        :param _Group group: the group.
+        :return: the summary notice.
+        :rtype: honeybadger_extensions.notice.Notice
+        """
+        sample = group.sample
+        request = dict(sample.request)
+        context = dict(request.get('context') or {})
+        context['aggregation'] = {
+            'occurrences': group.count,
+            'first_seen': _isoformat(group.first),
+            'last_seen': _isoformat(group.last),
+            'operations': sorted(group.operations),
+            'window': self.window,
+            'deduplicated': group.suppressed
+        }
+        request['context'] = context
+        return sample._replace(
+            message='%s (%d occurrences in %ss)' % (sample.message, group.count, self.window),
+            request=request
+        )
+
+    def flush(self):
+        """
+        Closes current window, emitting a summary notice for each error that occurred more than once.
+        :return: the number of summaries emitted.
+        :rtype: int
+        """
+        with self._lock:
+            groups, self._groups = self._groups, {}
+            self._window_end = None
+
+        emitted = 0
+        for group in groups.values():
+            if group.count < 2 or group.sample is None:
+                continue
+            try:
+                self.emit(self.summarize(group))
+                emitted += 1
+            except Exception:
+                logger.exception('Failed to emit error summary')
+        return emitted
+
+    def close(self):
+        """
+        Stops the flushing thread and emits summaries of current window.
+        """
+        with self._lock:
+            self._flusher = None
+            self._wakeup.notify_all()
+        self.flush()
@@ -0,0 +1,274 @@
+"""
+Asyncio delivery of notices, so that reporting an error from a coroutine does not block the event loop. Notices are
+put on a bounded queue and sent by a worker task over an asyncio connection, or through urllib in the loop's executor
+when a proxy is configured for the endpoint.
+"""
+import asyncio
+import logging
+import ssl
+from collections import deque
+from six.moves.urllib.error import HTTPError
+from six.moves.urllib.parse import urlsplit
+from six.moves.urllib.request import Request, getproxies, proxy_bypass, urlopen
+
+import honeybadger.connection as connection
+from honeybadger.utils import StringReprJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_TIMEOUT = 10.0
+
+_ssl_context = None
+
+
+def running_loop():
+    """
+    Returns the event loop running in current thread.
+    :return: the running loop or None if no loop is running.
+    :rtype: asyncio.AbstractEventLoop
+    """
+    try:
+        return asyncio._get_running_loop()
+    except AttributeError:  # pragma: no cover
+        return None
+
+
+def ssl_context():
+    """
+    Returns the SSL context used for all connections to the API. Creating it loads the system's CA certificates, which
+    takes tens of milliseconds, so it is only done once.
+    :rtype: ssl.SSLContext
+    """
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def uses_proxy(url):
+    """
+    Checks whether requests to an URL go through a proxy, configured with the HTTP_PROXY, HTTPS_PROXY and NO_PROXY
+    environment variables.
+    :param urllib.parse.SplitResult url: the URL.
+    :rtype: bool
+    """
+    return url.scheme in getproxies() and not proxy_bypass(url.hostname)
+
+
+def _post(url, headers, body, timeout):
+    try:
+        return urlopen(Request(url.geturl(), data=body, headers=headers), timeout=timeout).getcode()
+    except HTTPError as e:
+        return e.code
+
+
+async def _post_async(url, headers, body):
+    secure = url.scheme == 'https'
+    head = '\r\n'.join(
+        ['POST %s HTTP/1.1' % url.path, 'Host: %s' % url.netloc] +
+        ['%s: %s' % header for header in sorted(headers.items())] +
+        ['Content-Length: %d' % len(body), 'Connection: close', '', '']
+    )
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or (443 if secure else 80),
+                                                   ssl=ssl_context() if secure else None)
+    try:
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+        status_line = await reader.readline()
+    finally:
+        writer.close()
+    return int(status_line.split()[1])
+
+
+async def send_notice(config, payload, timeout=DEFAULT_TIMEOUT):
+    """
+    Sends a notice to honeybadger's API, like honeybadger.connection.send_notice does, but without blocking the loop.
+    :param honeybadger.config.Configuration config: honeybadger's configuration.
+    :param dict payload: the payload of the notice.
+    :param float timeout: number of seconds to wait for the API to respond.
+    :return: the status code of the response or None if the notice was not sent.
+    :rtype: int
+    """
+    if not config.api_key:
+        logger.error('Honeybadger API key missing from configuration: cannot report errors.')
+        return None
+
+    url = urlsplit('%s/v1/notices/' % config.endpoint.rstrip('/'))
+    body = connection.json.dumps(payload, cls=StringReprJSONEncoder).encode('utf-8')
+    headers = {
+        'X-Api-Key': config.api_key,
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+    }
+    if uses_proxy(url):
+        # urllib handles proxies, including tunnels for https, at the cost of a thread of the loop's executor.
+        request = asyncio.get_event_loop().run_in_executor(None, _post, url, headers, body, timeout)
+    else:
+        request = _post_async(url, headers, body)
+
+    status = await asyncio.wait_for(request, timeout)
+    if status != 201:
+        logger.error('Received error response [%s] from Honeybadger API.', status)
+    return status
+
+
+class AsyncNotifier(object):
+    """
+    Bounded queue of notices of an event loop, consumed by a worker task delivering them one at a time.
+
+    When the worker is cancelled, e.g. by asyncio.run shutting the loop down, notices still queued are delivered within
+    the timeout; those that could not be are passed to on_drop.
+    """
+    def __init__(self, deliver, maxsize=DEFAULT_QUEUE_SIZE, timeout=DEFAULT_TIMEOUT, on_drop=None):
+        """
+        Initialize notifier. Must be created while its loop is running.
+        :param callable deliver: coroutine function delivering a notice.
+        :param int maxsize: maximum number of notices waiting for delivery.
+        :param float timeout: number of seconds to keep delivering queued notices once the worker is cancelled.
+        :param callable on_drop: called with the number of notices that were queued but not delivered.
+        """
+        self.deliver = deliver
+        self.timeout = timeout
+        self.on_drop = on_drop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = asyncio.get_event_loop()
+        self._current = None
+        self.worker = asyncio.ensure_future(self._work())
+
+    async def _deliver(self, notice):
+        try:
+            await self.deliver(notice)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception('Failed to deliver notice')
+
+    async def _work(self):
+        try:
+            while True:
+                self._current = await self.queue.get()
+                await self._deliver(self._current)
+                self._current = None
+                self.queue.task_done()
+        except asyncio.CancelledError:
+            current, self._current = self._current, None
+            await self._drain([current] if current is not None else [])
+            raise
+
+    async def _drain(self, notices):
+        while not self.queue.empty():
+            notices.append(self.queue.get_nowait())
+        remaining = deque(notices)
+
+        async def deliver_remaining():
+            while remaining:
+                await self._deliver(remaining[0])
+                remaining.popleft()
+
+        if remaining:
+            try:
+                await asyncio.wait_for(deliver_remaining(), self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+        for _ in notices:
+            self.queue.task_done()
+        self.dropped(len(remaining))
+
+    def pending(self):
+        """
+        Returns the number of notices queued or being delivered.
+        :rtype: int
+        """
+        return self.queue.qsize() + (self._current is not None)
+
+    def dropped(self, count):
+        """
+        Reports notices that were queued but will never be delivered.
+        :param int count: the number of notices.
+        """
+        if count:
+            logger.warning('Dropping %d queued Honeybadger notices', count)
+            if self.on_drop is not None:
+                self.on_drop(count)
+
+    def enqueue(self, notice):
+        """
+        Queues a notice for delivery.
+        :param honeybadger_extensions.notice.Notice notice: the notice.
+        :return: False if the queue is full and the notice was dropped.
+        :rtype: bool
+        """
+        try:
+            self.queue.put_nowait(notice)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def flush(self):
+        """
+        Waits until all queued notices are delivered.
+        """
+        await self.queue.join()
+
+    async def close(self):
+        """
+        Delivers queued notices and stops the worker.
+        """
+        await self.flush()
+        self.worker.cancel()
+
+
+class AsyncNotifiers(object):
+    """
+    Notifiers by event loop, as asyncio queues and tasks cannot be shared between loops. Notifiers are keyed by the id
+    of their loop and forgotten as soon as their worker is done, so that loops are not retained once shut down.
+    Notifiers of loops closed while their worker was still running are forgotten when the next notifier is created.
+    """
+    def __init__(self, deliver, maxsize=DEFAULT_QUEUE_SIZE, timeout=DEFAULT_TIMEOUT, on_drop=None):
+        """
+        Initialize notifiers.
+        :param callable deliver: coroutine function delivering a notice.
+        :param int maxsize: maximum number of notices waiting for delivery, per loop.
+        :param float timeout: number of seconds to keep delivering queued notices when a loop shuts down.
+        :param callable on_drop: called with the number of notices that were queued but not delivered.
+        """
+        self.deliver = deliver
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.on_drop = on_drop
+        self._notifiers = {}
+
+    def get(self, loop):
+        """
+        Returns the notifier of a running loop, creating it if needed.
+        :param asyncio.AbstractEventLoop loop: the running loop.
+        :rtype: AsyncNotifier
+        """
+        key = id(loop)
+        notifier = self._notifiers.get(key)
+        if notifier is None or notifier.worker.done():
+            self._forget_closed()
+            notifier = self._notifiers[key] = AsyncNotifier(self.deliver, maxsize=self.maxsize, timeout=self.timeout,
+                                                            on_drop=self.on_drop)
+            notifier.worker.add_done_callback(lambda worker: self._forget(key, notifier))
+        return notifier
+
+    def _forget(self, key, notifier):
+        if self._notifiers.get(key) is notifier:
+            del self._notifiers[key]
+
+    def _forget_closed(self):
+        for key, notifier in list(self._notifiers.items()):
+            if notifier.loop.is_closed():
+                self._forget(key, notifier)
+                notifier.dropped(notifier.pending())
+
+    async def close(self):
+        """
+        Closes the notifier of the running loop, if any.
+        """
+        loop = running_loop()
+        notifier = self._notifiers.pop(id(loop), None) if loop is not None else None
+        if notifier is not None:
+            await notifier.close()
@@ -0,0 +1,130 @@
+import linecache
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CHECK_INTERVAL = 2.0
+
+
+def format_entry(code, lineno, project_root):
+    """
+    Formats a backtrace entry.
+    :param code code: the code object of the frame.
+    :param int lineno: the line number.
+    :param str project_root: the project root, replaced by [PROJECT_ROOT] in file names.
+    :return: the backtrace entry.
+    :rtype: dict
+    """
+    filename = code.co_filename
+    return {
+        'number': lineno,
+        'file': filename.replace(project_root, '[PROJECT_ROOT]') if project_root else filename,
+        'method': code.co_name
+    }
+
+
+class _CachedFrame(object):
+    __slots__ = ('entry', 'source', 'project_root', 'mtime')
+
+    def __init__(self, entry, project_root, mtime):
+        self.entry = entry
+        self.source = None
+        self.project_root = project_root
+        self.mtime = mtime
+
+
+class FrameCache(object):
+    """
+    Bounded LRU cache of formatted backtrace entries and source context, keyed by (code object, line number). Entries
+    of a file are invalidated when its modification time changes. Modification times are checked at most once every
+    check_interval seconds per file, so a burst of identical errors does not stat the same files over and over.
+
+    Cached entries are shared between notices and should not be modified.
+    """
+    def __init__(self, size=DEFAULT_CACHE_SIZE, check_interval=DEFAULT_CHECK_INTERVAL):
+        """
+        Initialize cache.
+        :param int size: maximum number of frames to keep.
+        :param float check_interval: minimum number of seconds between two checks of a file's modification time.
+        """
+        self.size = size
+        self.check_interval = check_interval
+        self._frames = OrderedDict()
+        self._mtimes = {}
+        self._lock = threading.Lock()
+
+    def _mtime(self, filename):
+        """
+        Returns the modification time of a file, as last checked.
+        :param str filename: the name of the file.
+        :return: the modification time or None if the file does not exist.
+        :rtype: float
+        """
+        now = monotonic()
+        checked = self._mtimes.get(filename)
+        if checked is not None and now - checked[1] < self.check_interval:
+            return checked[0]
+
+        try:
+            mtime = os.stat(filename).st_mtime
+        except OSError:
+            mtime = None
+        if checked is not None and checked[0] != mtime:
+            linecache.checkcache(filename)
+        self._mtimes[filename] = (mtime, now)
+        return mtime
+
+    def _get(self, code, lineno, project_root):
+        key = (code, lineno)
+        mtime = self._mtime(code.co_filename)
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is not None and cached.mtime == mtime and cached.project_root == project_root:
+                self._frames.move_to_end(key)
+                return cached
+
+        cached = _CachedFrame(format_entry(code, lineno, project_root), project_root, mtime)
+        with self._lock:
+            self._frames[key] = cached
+            while len(self._frames) > self.size:
+                self._frames.popitem(last=False)
+        return cached
+
+    def entry(self, code, lineno, project_root):
+        """
+        Returns the backtrace entry of a frame.
+        :param code code: the code object of the frame.
+        :param int lineno: the line number.
+        :param str project_root: the project root, replaced by [PROJECT_ROOT] in file names.
+        :return: the backtrace entry.
+        :rtype: dict
+        """
+        return self._get(code, lineno, project_root).entry
+
+    def source(self, code, lineno, project_root, loader):
+        """
+        Returns the source context of a frame.
+        :param code code: the code object of the frame.
+        :param int lineno: the line number.
+        :param str project_root: the project root.
+        :param callable loader: a callable accepting file name and line number, that reads the source context.
+        :return: the source context.
+        :rtype: dict[int, str]
+        """
+        cached = self._get(code, lineno, project_root)
+        if cached.source is None:
+            cached.source = loader(code.co_filename, lineno)
+        return cached.source
+
+    def clear(self):
+        """
+        Removes all cached entries.
+        """
+        with self._lock:
+            self._frames.clear()
+        self._mtimes.clear()
+
+    def __len__(self):
+        return len(self._frames)
@@ -1,15 +1,51 @@
+import asyncio
 import logging
-from honeybadger import honeybadger
-from ._helpers import csv_to_list
+import random
+import sys
+from time import perf_counter
+from honeybadger import honeybadger, payload
+import honeybadger.connection as connection
+import honeybadger.fake_connection as fake_connection
+from .config import ConfigProvider, DEFAULT_POLL_INTERVAL
+from .breadcrumbs import BreadcrumbTrail, BreadcrumbHandler, DEFAULT_BREADCRUMBS_SIZE
+from .slow import SlowOperationMonitor, DEFAULT_REPORT_INTERVAL
+from .notice import build_notice, error_fingerprint
+from .backtrace import FrameCache, DEFAULT_CACHE_SIZE
+from .encoding import JSONEncoder, AUTO_BACKEND
+from .metrics import StatsRegistry
+from .dedup import SharedDeduplicator, default_path as default_dedup_path, DEFAULT_SLOTS as DEFAULT_DEDUP_SLOTS
+from .aggregation import ErrorAggregator, DEFAULT_MAX_GROUPS, DEFAULT_MAX_OPERATIONS
+from .variables import LocalsCapture, DEFAULT_MAX_VALUE, DEFAULT_MAX_TOTAL, DEFAULT_TIME_BUDGET
+from . import aio
 from six import iteritems
 
 logger = logging.getLogger(__name__)
 
+# Handler printing honeybadger's log messages, added once no matter how many times extensions are initialized.
+_honeybadger_log_handler = logging.StreamHandler()
+
+
+class _Fallback(object):
+    """
+    Calls the generic_request_payload an extension's wrapper falls back to. The target can be replaced, so that a
+    wrapper can be unlinked from the chain of patched functions.
+    """
+    __slots__ = ('target', )
+
+    def __init__(self, target):
+        self.target = target
+
+    def __call__(self, request, context, config):
+        return self.target(request, context, config)
+
 
 class HoneybadgerExtension(object):
     """
     Base class for honeybadger extensions.
     """
+    #: error class used when reporting slow operations.
+    slow_error_class = 'SlowOperation'
+
     def __init__(self, context_generators={}, report_exceptions=False):
         """
         Initialize Honeybadger extension.
@@ -19,6 +55,17 @@ class HoneybadgerExtension(object):
         """
         self.context_generators = context_generators
         self.report_exception = report_exceptions
+        self.breadcrumbs = BreadcrumbTrail()
+        self.slow_operations = SlowOperationMonitor()
+        self.frame_cache = FrameCache()
+        self.stats = StatsRegistry()
+        self.deduplicator = None
+        self.aggregator = None
+        self.locals_capture = LocalsCapture()
+        self.config_provider = ConfigProvider({})
+        self.async_delivery = True
+        self.async_timeout = aio.DEFAULT_TIMEOUT
+        self.async_notifiers = aio.AsyncNotifiers(self.deliver_async, on_drop=self._count_dropped)
 
     def initialize_honeybadger(self, config):
         """
@@ -26,21 +73,224 @@ class HoneybadgerExtension(object):
         HONEYBADGER_ENVIRONMENT environment variable is set, honeybadger environment is also set.
         :param dict[str, T] config: the configuration object.
         """
+        self.breadcrumbs.size = int(config.get('HONEYBADGER_BREADCRUMBS_SIZE', DEFAULT_BREADCRUMBS_SIZE))
+        self._configure_slow_operations(config)
+        self._configure_reporting(config)
+        self.frame_cache.size = int(config.get('HONEYBADGER_BACKTRACE_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+        self._patch_notice_encoder(config.get('HONEYBADGER_JSON_BACKEND', AUTO_BACKEND))
+        self._configure_aggregation(config)
+        self._configure_deduplication(config)
+        self._configure_async_delivery(config)
+        self._configure_locals_capture(config)
         api_key = config.get('HONEYBADGER_API_KEY')
         # Initialize only if configured
         if api_key:
             logger.info('Configuring Honeybadger')
             honeybadger.configure(api_key=api_key,
-                                  environment=config.get('HONEYBADGER_ENVIRONMENT', 'development'),
-                                  params_filters=csv_to_list(config.get('HONEYBADGER_PARAMS_FILTERS',
-                                                                        'password,password_confirmation,credit_card'))
+                                  environment=config.get('HONEYBADGER_ENVIRONMENT', 'development')
                                   )
-            logging.getLogger('honeybadger').addHandler(logging.StreamHandler())
+            logging.getLogger('honeybadger').addHandler(_honeybadger_log_handler)
             return True
         else:
             logger.info('No Honeybadger API KEY found, skipping configuration')
             return False
 
+    def _install_request_payload(self, decorator):
+        """
+        Monkey-patches Honeybadger's generic_request_payload with the wrapper created by decorator. Wrappers previously
+        installed by extensions of the same class are unlinked first, so that initializing an extension again does not
+        keep chaining wrappers, each one keeping an old extension alive.
+        :param callable decorator: a callable accepting the function to fall back to and returning the wrapper.
+        """
+        self._uninstall_request_payload()
+        fallback = _Fallback(payload.generic_request_payload)
+        wrapper = decorator(fallback)
+        wrapper.fallback = fallback
+        wrapper.extension_class = self.__class__
+        payload.generic_request_payload = wrapper
+
+    def _uninstall_request_payload(self):
+        """
+        Removes wrappers of generic_request_payload installed by extensions of the same class.
+        """
+        current = payload.generic_request_payload
+        while getattr(current, 'extension_class', None) is self.__class__:
+            current = current.fallback.target
+        payload.generic_request_payload = current
+
+        while hasattr(current, 'fallback'):
+            target = current.fallback.target
+            if getattr(target, 'extension_class', None) is self.__class__:
+                current.fallback.target = target.fallback.target
+            else:
+                current = target
+
+    def _patch_notice_encoder(self, backend):
+        """
+        Monkey-patches Honeybadger's connection to encode notices using a fast JSON encoder, that also converts values
+        that are not JSON serializable to safe representations.
+        :param str backend: the name of the JSON backend to use.
+        """
+        if not hasattr(connection, 'json'):
+            logger.warning('Cannot replace the JSON encoder of this honeybadger version')
+            return
+        connection.json = JSONEncoder(backend)
+        logger.info('Monkey-patched notice encoder')
+
+    def _configure_aggregation(self, config):
+        """
+        Configures aggregation of error storms from HONEYBADGER_AGGREGATION_WINDOW, HONEYBADGER_AGGREGATION_MAX_GROUPS
+        and HONEYBADGER_AGGREGATION_MAX_OPERATIONS. Aggregation is disabled unless a window is configured.
+        :param dict[str, T] config: the configuration object.
+        """
+        if self.aggregator is not None:
+            self.aggregator.close()
+            self.aggregator = None
+
+        window = float(config.get('HONEYBADGER_AGGREGATION_WINDOW', 0))
+        if window > 0:
+            self.aggregator = ErrorAggregator(
+                window,
+                self._emit_summary,
+                max_groups=int(config.get('HONEYBADGER_AGGREGATION_MAX_GROUPS', DEFAULT_MAX_GROUPS)),
+                max_operations=int(config.get('HONEYBADGER_AGGREGATION_MAX_OPERATIONS', DEFAULT_MAX_OPERATIONS))
+            )
+
+    def _emit_summary(self, notice):
+        """
+        Sends the summary notice of an error storm. Called from the aggregator's timer thread.
+        :param honeybadger_extensions.notice.Notice notice: the summary notice.
+        """
+        self.stats.incr('summaries')
+        self.deliver(notice)
+
+    def _configure_deduplication(self, config):
+        """
+        Configures host-wide deduplication of errors from HONEYBADGER_DEDUP_WINDOW, HONEYBADGER_DEDUP_PATH and
+        HONEYBADGER_DEDUP_SLOTS. Deduplication is disabled unless a window is configured. The default path is specific
+        to the user, project root and environment.
+        :param dict[str, T] config: the configuration object.
+        """
+        if self.deduplicator is not None:
+            self.deduplicator.close()
+            self.deduplicator = None
+
+        window = float(config.get('HONEYBADGER_DEDUP_WINDOW', 0))
+        if window > 0:
+            path = config.get('HONEYBADGER_DEDUP_PATH')
+            if not path:
+                path = default_dedup_path(honeybadger.config.project_root,
+                                          config.get('HONEYBADGER_ENVIRONMENT', honeybadger.config.environment))
+            self.deduplicator = SharedDeduplicator(
+                window,
+                path=path,
+                slots=int(config.get('HONEYBADGER_DEDUP_SLOTS', DEFAULT_DEDUP_SLOTS))
+            )
+
+    def _configure_async_delivery(self, config):
+        """
+        Configures delivery of notices from coroutines from HONEYBADGER_ASYNC_DELIVERY, HONEYBADGER_ASYNC_QUEUE_SIZE
+        and HONEYBADGER_ASYNC_TIMEOUT.
+        :param dict[str, T] config: the configuration object.
+        """
+        self.async_delivery = str(config.get('HONEYBADGER_ASYNC_DELIVERY', True)).lower() not in ('false', '0', 'no')
+        self.async_timeout = float(config.get('HONEYBADGER_ASYNC_TIMEOUT', aio.DEFAULT_TIMEOUT))
+        self.async_notifiers.maxsize = int(config.get('HONEYBADGER_ASYNC_QUEUE_SIZE', aio.DEFAULT_QUEUE_SIZE))
+        self.async_notifiers.timeout = self.async_timeout
+
+    def _configure_locals_capture(self, config):
+        """
+        Configures capture of local variables of failing frames from HONEYBADGER_CAPTURE_LOCALS,
+        HONEYBADGER_LOCALS_MAX_VALUE, HONEYBADGER_LOCALS_MAX_TOTAL, HONEYBADGER_LOCALS_TIME_BUDGET and
+        HONEYBADGER_LOCALS_FULL_REPR. Capture is disabled unless a number of frames is configured.
+        :param dict[str, T] config: the configuration object.
+        """
+        self.locals_capture.frames = int(config.get('HONEYBADGER_CAPTURE_LOCALS', 0))
+        self.locals_capture.max_value = int(config.get('HONEYBADGER_LOCALS_MAX_VALUE', DEFAULT_MAX_VALUE))
+        self.locals_capture.max_total = int(config.get('HONEYBADGER_LOCALS_MAX_TOTAL', DEFAULT_MAX_TOTAL))
+        self.locals_capture.time_budget = float(config.get('HONEYBADGER_LOCALS_TIME_BUDGET', DEFAULT_TIME_BUDGET))
+        full_repr = str(config.get('HONEYBADGER_LOCALS_FULL_REPR', False)).lower()
+        self.locals_capture.full_repr = full_repr in ('true', '1', 'yes')
+
+    def _configure_reporting(self, config):
+        """
+        Configures the reloadable reporting configuration (filters, excluded headers, sample rates and slow
+        thresholds), optionally overridden by the JSON file at HONEYBADGER_CONFIG_FILE, checked every
+        HONEYBADGER_CONFIG_POLL_INTERVAL seconds, and reloaded on HONEYBADGER_RELOAD_SIGNAL.
+        :param dict[str, T] config: the configuration object.
+        """
+        self.config_provider.uninstall_signal_handler()
+        self.config_provider = ConfigProvider(
+            config,
+            path=config.get('HONEYBADGER_CONFIG_FILE'),
+            interval=float(config.get('HONEYBADGER_CONFIG_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)),
+            on_change=self._apply_reporting_config
+        )
+        reload_signal = config.get('HONEYBADGER_RELOAD_SIGNAL')
+        if reload_signal:
+            self.config_provider.install_signal_handler(reload_signal)
+
+    def _apply_reporting_config(self, reporting):
+        """
+        Applies a new reporting configuration to the components that do not read it directly.
+        :param honeybadger_extensions.config.ReportingConfig reporting: the new configuration.
+        """
+        self.slow_operations.threshold = reporting.slow_threshold
+        self.slow_operations.thresholds = reporting.slow_thresholds
+
+    @property
+    def reporting(self):
+        """
+        Current reporting configuration. Reading it never blocks.
+        :rtype: honeybadger_extensions.config.ReportingConfig
+        """
+        return self.config_provider.get()
+
+    @property
+    def params_filters(self):
+        """
+        Parameters filtered from notices: those configured in honeybadger, e.g. with its HONEYBADGER_PARAMS_FILTERS
+        environment variable or honeybadger.configure, and those of the current reporting configuration.
+        :rtype: frozenset[str]
+        """
+        return frozenset(honeybadger.config.params_filters or ()) | self.reporting.params_filters
+
+    def _configure_slow_operations(self, config):
+        """
+        Configures reporting of slow operations from HONEYBADGER_SLOW_REPORT_INTERVAL. Thresholds are part of the
+        reporting configuration.
+        :param dict[str, T] config: the configuration object.
+        """
+        self.slow_operations.interval = float(config.get('HONEYBADGER_SLOW_REPORT_INTERVAL', DEFAULT_REPORT_INTERVAL))
+
+    def _current_operation(self):
+        """
+        Returns the name of the operation (endpoint, task etc) currently handled.
+        :return: the name of the operation or None if not known.
+        :rtype: str
+        """
+        return None
+
+    def _report_slow_operation(self):
+        """
+        Stops timing current operation and reports it to honeybadger if it exceeded its threshold.
+        """
+        duration = self.slow_operations.stop()
+        if duration is None:
+            return
+        name = self._current_operation()
+        if name is None or not self.slow_operations.should_report(name, duration):
+            return
+
+        threshold = self.slow_operations.threshold_for(name)
+        logger.info('%s took %.3fs, reporting as slow', name, duration)
+        self.stats.incr('slow_reported')
+        notice = self.build_notice({
+            'error_class': self.slow_error_class,
+            'error_message': '%s took %.3fs (threshold: %.3fs)' % (name, duration, threshold)
+        }, context={'operation': name, 'duration': duration, 'threshold': threshold})
+        self.dispatch(notice)
+
     def _generate_context(self):
         """
         Generate context for exception handling.
@@ -53,12 +303,46 @@ class HoneybadgerExtension(object):
 
         return context
 
+    def _payload_context(self, context):
+        """
+        Returns the context to send along with a notice, adding breadcrumbs recorded so far, if any.
+        :param dict context: the context as passed by honeybadger.
+        :return: the context to use in the payload.
+        :rtype: dict
+        """
+        if not len(self.breadcrumbs):
+            return context
+        context = dict(context)
+        context['breadcrumbs'] = self.breadcrumbs.serialize()
+        return context
+
+    def add_breadcrumb(self, message, category='custom', metadata=None):
+        """
+        Records a breadcrumb for current request or task. Breadcrumbs are sent only along with a notice.
+        :param str message: the message of the breadcrumb.
+        :param str category: the category of the breadcrumb.
+        :param dict metadata: additional data to attach to the breadcrumb.
+        """
+        self.breadcrumbs.add(message, category=category, metadata=metadata)
+
+    def breadcrumb_handler(self, level=logging.INFO):
+        """
+        Creates a logging handler that records log messages as breadcrumbs.
+        :param int level: minimum level of records to keep.
+        :return: the logging handler.
+        :rtype: BreadcrumbHandler
+        """
+        return BreadcrumbHandler(self.breadcrumbs, level=level)
+
     def setup_context(self, *args, **kwargs):
         """
         Sets context for the request.
         :param T sender: the object sending the signal.
         :param extra: extra arguments passed by the signal.
         """
+        self.config_provider.get()
+        if self.slow_operations.enabled:
+            self.slow_operations.start()
         honeybadger.set_context(**self._generate_context())
 
     def reset_context(self, *args, **kwargs):
@@ -68,11 +352,179 @@ class HoneybadgerExtension(object):
         :param Exception exc: exception caused during handling.
         :param extra: extras passed by the signal.
         """
+        if self.slow_operations.enabled:
+            self._report_slow_operation()
         honeybadger.reset_context()
+        self.breadcrumbs.clear()
+
+    def _traceback(self, exception):
+        """
+        Returns the traceback of an exception.
+        :param Exception|dict exception: the exception.
+        :return: the traceback or None if not available.
+        :rtype: traceback
+        """
+        if isinstance(exception, dict):
+            return None
+        return getattr(exception, '__traceback__', None) or sys.exc_info()[2]
+
+    def _capture_locals(self, exc_traceback):
+        """
+        Captures local variables of the failing frames, if enabled.
+        :param traceback exc_traceback: the traceback of the exception.
+        :return: the captured variables or None.
+        :rtype: dict
+        """
+        if not self.locals_capture.enabled or exc_traceback is None:
+            return None
+        started = perf_counter()
+        try:
+            return self.locals_capture.capture(exc_traceback, honeybadger.config, filters=self.params_filters)
+        except Exception:
+            logger.exception('Failed to capture local variables')
+            return None
+        finally:
+            self.stats.observe('locals_capture_time', perf_counter() - started)
+
+    def build_notice(self, exception, exc_traceback=None, context=None, local_variables=None):
+        """
+        Creates a compact notice for the given exception, using honeybadger's current context.
+        :param Exception|dict exception: the exception, or a dictionary with error_class and error_message.
+        :param traceback exc_traceback: the traceback, if different than the one of the exception.
+        :param dict context: additional context.
+        :param dict local_variables: captured local variables of failing frames, if any.
+        :return: the notice.
+        :rtype: honeybadger_extensions.notice.Notice
+        """
+        if exc_traceback is None:
+            exc_traceback = self._traceback(exception)
+
+        started = perf_counter()
+        merged_context = dict(honeybadger._get_context())
+        merged_context.update(context or {})
+        notice = build_notice(exception, exc_traceback, honeybadger.config, merged_context,
+                              request=honeybadger._get_request(), frame_cache=self.frame_cache,
+                              local_variables=local_variables)
+        self.stats.observe('payload_build_time', perf_counter() - started)
+        return notice
+
+    def deliver(self, notice):
+        """
+        Hands a notice to honeybadger, which sends it from a background thread. Errors while handing it off are logged
+        and counted, never raised; the outcome of the HTTP request itself is not observable from here.
+        :param honeybadger_extensions.notice.Notice notice: the notice to send.
+        :return: whether the notice was handed off.
+        :rtype: bool
+        """
+        config = honeybadger.config
+        started = perf_counter()
+        try:
+            if config.is_dev() and not config.force_report_data:
+                fake_connection.send_notice(config, notice.to_payload())
+            else:
+                connection.send_notice(config, notice.to_payload())
+        except Exception:
+            logger.exception('Failed to send notice to honeybadger')
+            self.stats.incr('failed')
+            return False
+        finally:
+            self.stats.observe('handoff_latency', perf_counter() - started)
+        self.stats.incr('handed_off')
+        return True
+
+    async def deliver_async(self, notice):
+        """
+        Sends a notice to honeybadger without blocking the event loop. Errors while sending are logged and counted,
+        never raised.
+        :param honeybadger_extensions.notice.Notice notice: the notice to send.
+        :return: whether the notice was accepted.
+        :rtype: bool
+        """
+        config = honeybadger.config
+        started = perf_counter()
+        try:
+            if config.is_dev() and not config.force_report_data:
+                fake_connection.send_notice(config, notice.to_payload())
+                status = 201
+            else:
+                status = await aio.send_notice(config, notice.to_payload(), timeout=self.async_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception('Failed to send notice to honeybadger')
+            status = None
+        finally:
+            self.stats.observe('delivery_latency', perf_counter() - started)
+        if status != 201:
+            self.stats.incr('failed')
+            return False
+        self.stats.incr('delivered')
+        return True
+
+    async def notify_async(self, exception, context=None):
+        """
+        Reports an exception to honeybadger from a coroutine, waiting for the notice to be sent.
+        :param Exception|dict exception: the exception, or a dictionary with error_class and error_message.
+        :param dict context: additional context.
+        :return: whether the notice was accepted.
+        :rtype: bool
+        """
+        self.stats.incr('attempted')
+        notice = self.build_notice(exception, context=context)
+        return await self.deliver_async(notice)
+
+    def dispatch(self, notice):
+        """
+        Sends a notice, without blocking if called from a running event loop: the notice is then queued and sent by a
+        worker task of the loop. Notices are dropped, and counted, if the queue is full.
+        :param honeybadger_extensions.notice.Notice notice: the notice to send.
+        """
+        loop = aio.running_loop() if self.async_delivery else None
+        if loop is None:
+            self.deliver(notice)
+        elif not self.async_notifiers.get(loop).enqueue(notice):
+            logger.warning('Honeybadger notice queue is full, dropping notice')
+            self.stats.incr('dropped')
+
+    def _count_dropped(self, count):
+        """
+        Counts notices that were queued by a loop that shut down before they could be sent.
+        :param int count: the number of notices.
+        """
+        self.stats.incr('dropped', count)
 
     def handle_exception(self, exception=None):
         """
-        Actual code handling the exception and sending it to honeybadger if it's enabled.
+        Actual code handling the exception and sending it to honeybadger if it's enabled. Errors not sampled, repeated
+        occurrences of an error during an aggregation window, and errors already reported by another process of the
+        host, are skipped before building anything; only the first of the latter in a window is built, as the base of
+        its summary. Otherwise, the exception is converted to a compact notice right away, so its traceback is not
+        retained until delivery.
         :param Exception exception: the exception to handle.
         """
-        honeybadger.notify(exception)
+        self.stats.incr('attempted')
+        operation = self._current_operation()
+        rate = self.reporting.sample_rate_for(operation)
+        if rate < 1 and random.random() >= rate:
+            self.stats.incr('sampled_out')
+            return
+        exc_traceback = self._traceback(exception)
+        fingerprint = None
+        if self.aggregator is not None or self.deduplicator is not None:
+            fingerprint = error_fingerprint(exception, exc_traceback)
+
+        if self.aggregator is not None and self.aggregator.record(fingerprint, operation):
+            self.stats.incr('aggregated')
+            return
+        if self.deduplicator is not None and self.deduplicator.seen(fingerprint):
+            self.stats.incr('deduplicated')
+            if self.aggregator is not None:
+                # Keep counting the error, so that the summary of the window still tells how many occurrences this
+                # process saw. The notice is built once per error and window, without local variables.
+                self.aggregator.suppress(fingerprint, self.build_notice(exception, exc_traceback))
+            return
+        notice = self.build_notice(exception, exc_traceback, local_variables=self._capture_locals(exc_traceback))
+        del exc_traceback
+        if self.aggregator is not None:
+            self.aggregator.set_sample(fingerprint, notice)
+        self.dispatch(notice)
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+from collections import deque
+
+DEFAULT_BREADCRUMBS_SIZE = 40
+
+
+class Breadcrumb(object):
+    """
+    A single breadcrumb. Messages are kept unformatted until the breadcrumb is serialized, so recording one costs
+    little more than a tuple allocation.
+    """
+    __slots__ = ('timestamp', 'category', 'message', 'args', 'metadata')
+
+    def __init__(self, timestamp, category, message, args=None, metadata=None):
+        self.timestamp = timestamp
+        self.category = category
+        self.message = message
+        self.args = args
+        self.metadata = metadata
+
+    def to_dict(self):
+        """
+        Serializes breadcrumb to a dictionary.
+        :return: a dictionary with the breadcrumb's data.
+        :rtype: dict
+        """
+        message = self.message
+        if self.args:
+            try:
+                message = message % self.args
+            except (TypeError, ValueError):
+                message = '%s %r' % (message, self.args)
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.timestamp)),
+            'category': self.category,
+            'message': str(message),
+            'metadata': self.metadata or {}
+        }
+
+
+class BreadcrumbTrail(object):
+    """
+    Bounded, per-thread ring buffer of breadcrumbs. Since both Flask requests and Celery tasks are handled by a single
+    thread, each request or task gets its own trail.
+    """
+    def __init__(self, size=DEFAULT_BREADCRUMBS_SIZE):
+        """
+        Initialize trail.
+        :param int size: maximum number of breadcrumbs to keep. Oldest breadcrumbs are discarded first.
+        """
+        self.size = size
+        self._local = threading.local()
+
+    def _buffer(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.maxlen != self.size:
+            buffer = self._local.buffer = deque(maxlen=self.size)
+        return buffer
+
+    def add(self, message, category='custom', args=None, metadata=None):
+        """
+        Records a breadcrumb for the current request or task.
+        :param str message: the message of the breadcrumb. Can be a %-format string, in which case it is formatted
+        using args only when a notice is sent.
+        :param str category: the category of the breadcrumb.
+        :param tuple args: arguments for formatting message.
+        :param dict metadata: additional data to attach.
+        """
+        if self.size > 0:
+            self._buffer().append(Breadcrumb(time.time(), category, message, args, metadata))
+
+    def clear(self):
+        """
+        Drops all breadcrumbs recorded by current thread.
+        """
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is not None:
+            buffer.clear()
+
+    def __len__(self):
+        buffer = getattr(self._local, 'buffer', None)
+        return len(buffer) if buffer is not None else 0
+
+    def serialize(self):
+        """
+        Serializes breadcrumbs recorded by current thread, oldest first.
+        :return: a list of dictionaries.
+        :rtype: list[dict]
+        """
+        buffer = getattr(self._local, 'buffer', None)
+        if not buffer:
+            return []
+        return [breadcrumb.to_dict() for breadcrumb in list(buffer)]
+
+
+class BreadcrumbHandler(logging.Handler):
+    """
+    Logging handler that records log records as breadcrumbs.
+    """
+    def __init__(self, trail, level=logging.INFO):
+        """
+        Initialize handler.
+        :param BreadcrumbTrail trail: the trail to record breadcrumbs to.
+        :param int level: minimum level of records to keep.
+        """
+        super(BreadcrumbHandler, self).__init__(level=level)
+        self.trail = trail
+
+    def emit(self, record):
+        self.trail.add(record.msg, category='log', args=record.args, metadata={
+            'logger': record.name,
+            'level': record.levelname
+        })
@@ -2,19 +2,19 @@ from __future__ import division, print_function, absolute_import
 
 import logging
 
-from honeybadger import payload
-
 from celery import current_task
 from celery.signals import task_failure, task_prerun, task_postrun
+from celery.worker.control import inspect_command
 from .base import HoneybadgerExtension
 
 logger = logging.getLogger(__name__)
 
 
 class CeleryHoneybadgerFailureHandler(HoneybadgerExtension):
+    slow_error_class = 'SlowTask'
 
     def __init__(self):
-        self.context_generators = {}
+        super(CeleryHoneybadgerFailureHandler, self).__init__()
         self.report_exceptions = False
 
     def install(self, config={}, context_generators={}, report_exceptions=False):
@@ -35,6 +35,9 @@ class CeleryHoneybadgerFailureHandler(HoneybadgerExtension):
         self._patch_generic_request_payload()
         logger.info('Registered Celery signal handlers')
 
+        if config.get('HONEYBADGER_STATS_INSPECT'):
+            self._register_inspect_command()
+
     def _failure_handler(self, sender, task_id, exception, args, kwargs, traceback, einfo, **kw):
         """
         Handle failures.
@@ -50,12 +53,33 @@ class CeleryHoneybadgerFailureHandler(HoneybadgerExtension):
         """
         self.handle_exception(exception=exception)
 
+    def _register_inspect_command(self):
+        """
+        Registers the honeybadger_stats inspect command, so that statistics can be retrieved with
+        `celery inspect honeybadger_stats`.
+        """
+        def honeybadger_stats(state, **kwargs):
+            """Statistics of the Honeybadger extension."""
+            return self.stats.snapshot()
+
+        inspect_command(name='honeybadger_stats')(honeybadger_stats)
+        logger.info('Registered honeybadger_stats inspect command')
+
+    def _current_operation(self):
+        """
+        Returns the name of the current task.
+        :rtype: str
+        """
+        return current_task.name if current_task else None
+
     def _patch_generic_request_payload(self):
         """
         Monkey-patches Honeybadger's generic_request_payload to add information from Celery task.
         """
         def generic_request_payload_decorator(original):
             def _wrapper(request, context, config):
+                if not current_task:
+                    return original(request, context, config)
                 payload = {
                     'component': current_task.__module__,
                     'action': current_task.name,
@@ -68,22 +92,26 @@ class CeleryHoneybadgerFailureHandler(HoneybadgerExtension):
                         'retries': current_task.request.retries,
                         'max_retries': current_task.max_retries
                     },
-                    'context': context
+                    'context': self._payload_context(context)
                 }
 
                 return payload
 
             return _wrapper
 
-        payload.generic_request_payload = generic_request_payload_decorator(payload.generic_request_payload)
+        self._install_request_payload(generic_request_payload_decorator)
         logger.info('Monkey-patched generic_request_payload')
 
     def teardown(self):
         """
-        Removes current failure handler
+        Removes current failure handler, emitting summaries of errors aggregated so far.
         """
         task_prerun.disconnect(self.setup_context)
         task_postrun.disconnect(self.reset_context)
         if self.report_exceptions:
             task_failure.disconnect(self._failure_handler)
+        self._uninstall_request_payload()
+        if self.aggregator is not None:
+            self.aggregator.close()
+            self.aggregator = None
         logger.info('Honeybadger Celery support uninstalled')
@@ -0,0 +1,217 @@
+"""
+Reporting configuration that can be changed without restarting processes. Settings are compiled to an immutable
+object, which is replaced as a whole when the configuration changes, so readers never need a lock.
+"""
+import json
+import logging
+import os
+import signal
+import threading
+from collections import namedtuple
+from time import monotonic
+from types import MappingProxyType
+
+from six import iteritems, string_types
+
+from ._helpers import csv_to_list, csv_to_dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARAMS_FILTERS = 'password,password_confirmation,credit_card'
+DEFAULT_SKIP_HEADERS = ', '.join([
+    'Authorization',
+    'Proxy-Authorization'
+])
+DEFAULT_POLL_INTERVAL = 5.0
+
+#: configuration keys that can be changed at runtime, through the configuration file.
+RELOADABLE_KEYS = (
+    'HONEYBADGER_PARAMS_FILTERS',
+    'HONEYBADGER_EXCLUDE_HEADERS',
+    'HONEYBADGER_SAMPLE_RATE',
+    'HONEYBADGER_SAMPLE_RATES',
+    'HONEYBADGER_SLOW_THRESHOLD',
+    'HONEYBADGER_SLOW_THRESHOLDS'
+)
+
+
+def _to_frozenset(value):
+    if isinstance(value, string_types):
+        value = csv_to_list(value)
+    return frozenset(value)
+
+
+def _to_floats(value):
+    return MappingProxyType({k: float(v) for k, v in iteritems(csv_to_dict(value))})
+
+
+class ReportingConfig(namedtuple('ReportingConfig', ['params_filters', 'skip_headers', 'sample_rate',
+                                                     'sample_rates', 'slow_threshold', 'slow_thresholds'])):
+    """
+    Compiled, immutable reporting configuration.
+    """
+    __slots__ = ()
+
+    def sample_rate_for(self, name):
+        """
+        Returns the fraction of errors to report for an endpoint or task.
+        :param str name: the name of the endpoint or task, if known.
+        :rtype: float
+        """
+        return self.sample_rates.get(name, self.sample_rate)
+
+
+def compile_config(config):
+    """
+    Compiles reporting configuration.
+    :param dict[str, T] config: the configuration object.
+    :return: the compiled configuration.
+    :rtype: ReportingConfig
+    """
+    slow_threshold = config.get('HONEYBADGER_SLOW_THRESHOLD')
+    return ReportingConfig(
+        params_filters=_to_frozenset(config.get('HONEYBADGER_PARAMS_FILTERS', DEFAULT_PARAMS_FILTERS)),
+        skip_headers=_to_frozenset(config.get('HONEYBADGER_EXCLUDE_HEADERS', DEFAULT_SKIP_HEADERS)),
+        sample_rate=float(config.get('HONEYBADGER_SAMPLE_RATE', 1.0)),
+        sample_rates=_to_floats(config.get('HONEYBADGER_SAMPLE_RATES', '')),
+        slow_threshold=float(slow_threshold) if slow_threshold is not None else None,
+        slow_thresholds=_to_floats(config.get('HONEYBADGER_SLOW_THRESHOLDS', ''))
+    )
+
+
+class ConfigProvider(object):
+    """
+    Provides the current reporting configuration. The configuration is compiled from the application's configuration,
+    overridden by the keys of an optional JSON file. The file is checked for changes at most once per interval, by
+    whichever thread reads the configuration first; reloading can also be requested with a signal.
+
+    Reading the configuration never blocks: a reload swaps the compiled configuration in a single assignment, and
+    threads that find another thread reloading keep using the previous configuration.
+    """
+    def __init__(self, config, path=None, interval=DEFAULT_POLL_INTERVAL, on_change=None):
+        """
+        Initialize provider, compiling current configuration.
+        :param dict[str, T] config: the configuration object.
+        :param str path: path of a JSON file with configuration keys to override, if any.
+        :param float interval: minimum seconds between two checks of the file.
+        :param callable on_change: called with the new configuration, whenever it is compiled.
+        """
+        self.base = {key: config[key] for key in RELOADABLE_KEYS if key in config}
+        self.path = path
+        self.interval = interval
+        self.on_change = on_change
+        self.current = None
+        self._mtime = None
+        self._next_check = 0
+        self._reload_requested = False
+        self._signal = None
+        self._previous_handler = None
+        self._lock = threading.Lock()
+        self._swap(compile_config(self.base))
+        if path:
+            self._check()
+
+    def get(self):
+        """
+        Returns current configuration, reloading it first if the file changed or a reload was requested.
+        :rtype: ReportingConfig
+        """
+        if self._reload_requested or (self.path and monotonic() >= self._next_check):
+            if self._lock.acquire(False):
+                try:
+                    self._check()
+                finally:
+                    self._lock.release()
+        return self.current
+
+    def _swap(self, compiled):
+        self.current = compiled
+        if self.on_change is not None:
+            self.on_change(compiled)
+
+    def _check(self):
+        reload_requested, self._reload_requested = self._reload_requested, False
+        self._next_check = monotonic() + self.interval
+        try:
+            mtime = os.stat(self.path).st_mtime if self.path else None
+        except OSError:
+            mtime = None
+        if mtime != self._mtime or reload_requested:
+            self._mtime = mtime
+            self.reload()
+
+    def _read(self):
+        if not self.path:
+            return {}
+        try:
+            with open(self.path) as f:
+                overrides = json.load(f)
+        except (IOError, OSError):
+            return {}
+        if not isinstance(overrides, dict):
+            raise ValueError('%s must contain a JSON object' % self.path)
+        unknown = set(overrides) - set(RELOADABLE_KEYS)
+        if unknown:
+            logger.warning('Ignoring configuration keys that cannot be reloaded: %s', ', '.join(sorted(unknown)))
+        return {key: value for key, value in iteritems(overrides) if key in RELOADABLE_KEYS}
+
+    def reload(self):
+        """
+        Reads the file and swaps current configuration. If the file is invalid, current configuration is kept.
+        :return: whether the configuration was reloaded.
+        :rtype: bool
+        """
+        try:
+            config = dict(self.base)
+            config.update(self._read())
+            compiled = compile_config(config)
+        except (ValueError, TypeError, AttributeError):
+            logger.warning('Invalid Honeybadger configuration in %s, keeping current configuration', self.path,
+                           exc_info=True)
+            return False
+        if compiled != self.current:
+            logger.info('Reloaded Honeybadger configuration')
+            self._swap(compiled)
+        return True
+
+    def _request_reload(self, signum, frame):
+        if self._signal is not None:
+            self._reload_requested = True
+        if callable(self._previous_handler):
+            self._previous_handler(signum, frame)
+
+    def install_signal_handler(self, name):
+        """
+        Requests a reload of the configuration whenever the process receives a signal. The reload happens on the next
+        read of the configuration, not in the signal handler. The handler previously installed for the signal, if any,
+        is still called.
+        :param str name: the name of the signal, e.g. 'SIGUSR2'.
+        :return: whether the handler was installed.
+        :rtype: bool
+        """
+        try:
+            signum = getattr(signal, name)
+            previous = signal.getsignal(signum)
+            signal.signal(signum, self._request_reload)
+        except (AttributeError, ValueError):
+            logger.warning('Cannot reload Honeybadger configuration on %s', name, exc_info=True)
+            return False
+        self._signal = signum
+        self._previous_handler = previous
+        return True
+
+    def uninstall_signal_handler(self):
+        """
+        Stops reloading the configuration on the signal, restoring the handler previously installed for it. If another
+        handler was installed since, and calls this one, this handler only keeps calling the previous one.
+        """
+        signum, self._signal = self._signal, None
+        if signum is None:
+            return
+        try:
+            if signal.getsignal(signum) == self._request_reload:
+                previous = self._previous_handler
+                signal.signal(signum, previous if previous is not None else signal.SIG_DFL)
+                self._previous_handler = None
+        except ValueError:
+            logger.warning('Cannot restore the previous handler of signal %s', signum, exc_info=True)
@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOTS = 4096
+DEFAULT_PROBES = 4
+
+# Each slot holds a fingerprint and the (wall clock) time it expires at.
+_SLOT = struct.Struct('<Qd')
+
+
+def _uid():
+    return os.getuid() if hasattr(os, 'getuid') else None
+
+
+def default_path(project_root, environment):
+    """
+    Returns the default path of the table, in the temporary directory. The path is specific to the current user and to
+    the application, so that unrelated applications of the same host do not share fingerprints.
+    :param str project_root: the root directory of the application.
+    :param str environment: the honeybadger environment of the application.
+    :rtype: str
+    """
+    scope = hashlib.sha1(('%s\0%s' % (project_root, environment)).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), 'honeybadger-extensions-dedup-%s-%s' % (_uid(), scope))
+
+
+class SharedDeduplicator(object):
+    """
+    Host-wide table of recently reported errors, shared by all processes through a memory-mapped file. It lets
+    workers of the same host report each error only once per window.
+
+    The table is a fixed-size, open-addressing hash table, so its size is bounded and lookups touch a handful of
+    slots. Slots are read and written without locking: a race between two processes may at worst let a duplicate
+    through.
+    """
+    def __init__(self, window, path, slots=DEFAULT_SLOTS, probes=DEFAULT_PROBES):
+        """
+        Initialize deduplicator. The file is opened lazily, on first use.
+        :param float window: number of seconds during which an error is considered a duplicate.
+        :param str path: path of the file backing the table.
+        :param int slots: number of slots of the table.
+        :param int probes: number of slots checked for each fingerprint.
+        """
+        self.window = window
+        self.path = path
+        self.slots = slots
+        self.probes = min(probes, slots)
+        self._map = None
+        self._failed = False
+
+    def _open(self):
+        size = self.slots * _SLOT.size
+        # Never follow a symbolic link planted at the path, e.g. by another user of a shared temporary directory.
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+        try:
+            status = os.fstat(fd)
+            uid = _uid()
+            if not stat.S_ISREG(status.st_mode) or (uid is not None and status.st_uid != uid):
+                raise OSError('%s is not a regular file owned by the current user' % self.path)
+            if status.st_size < size:
+                os.ftruncate(fd, size)
+            return mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def _table(self):
+        if self._map is None and not self._failed:
+            try:
+                self._map = self._open()
+            except (OSError, ValueError):
+                logger.warning('Cannot open deduplication table %s, deduplication disabled', self.path, exc_info=True)
+                self._failed = True
+        return self._map
+
+    def seen(self, fingerprint):
+        """
+        Checks whether an error was reported recently by any process on this host, and records it otherwise.
+        :param int fingerprint: the 64-bit fingerprint of the error.
+        :return: True if the error is a duplicate and should not be reported.
+        :rtype: bool
+        """
+        table = self._table()
+        if table is None:
+            return False
+
+        fingerprint = fingerprint or 1  # 0 marks empty slots
+        now = time.time()
+        start = fingerprint % self.slots
+        candidate = None
+        candidate_expires = None
+        for i in range(self.probes):
+            offset = ((start + i) % self.slots) * _SLOT.size
+            slot_fingerprint, expires = _SLOT.unpack_from(table, offset)
+            if slot_fingerprint == fingerprint:
+                if expires > now:
+                    return True
+                candidate = offset
+                break
+            # Reuse the slot that expires first, preferring empty or expired ones.
+            if candidate is None or expires < candidate_expires:
+                candidate, candidate_expires = offset, expires
+
+        _SLOT.pack_into(table, candidate, fingerprint, now + self.window)
+        return False
+
+    def close(self):
+        """
+        Unmaps the table.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
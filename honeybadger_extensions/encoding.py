@@ -0,0 +1,171 @@
+"""
+JSON encoding of notice payloads. Uses orjson when installed and falls back to the standard library otherwise. Values
+that are not JSON serializable (datetimes, decimals, ORM models etc) are converted to safe representations while
+encoding, in a single pass.
+"""
+import datetime
+import decimal
+import json
+import logging
+import re
+import uuid
+from json.encoder import encode_basestring_ascii
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+AUTO_BACKEND = 'auto'
+MAX_DEPTH = 32
+
+_NON_ASCII_RUN = re.compile(b'[\x80-\xff]+')
+
+
+def _isoformat(obj):
+    return obj.isoformat()
+
+
+def _decode(obj):
+    return obj.decode('utf-8', 'replace')
+
+
+#: converters of common types, looked up by exact type before falling back to isinstance checks.
+CONVERTERS = {
+    datetime.datetime: _isoformat,
+    datetime.date: _isoformat,
+    datetime.time: _isoformat,
+    decimal.Decimal: str,
+    uuid.UUID: str,
+    set: list,
+    frozenset: list,
+    tuple: list,
+    bytes: _decode
+}
+
+
+def default(obj):
+    """
+    Converts an object that is not JSON serializable to a safe representation.
+    :param T obj: the object to convert.
+    :return: a JSON serializable value.
+    """
+    converter = CONVERTERS.get(type(obj))
+    if converter is not None:
+        return converter(obj)
+    for cls, converter in CONVERTERS.items():
+        if isinstance(obj, cls):
+            return converter(obj)
+    if hasattr(obj, 'items'):
+        try:
+            return {str(k): v for k, v in obj.items()}
+        except Exception:
+            pass
+    try:
+        return repr(obj)
+    except Exception:
+        return '[unserializable]'
+
+
+def _sanitize(obj, depth=0):
+    """
+    Recursively converts keys to strings and unknown values to safe representations. Used only when a backend could
+    not encode a payload in a single pass, e.g. because of circular references.
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if depth >= MAX_DEPTH:
+        return '[too deep]'
+    if isinstance(obj, dict):
+        return {str(k): _sanitize(v, depth + 1) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [_sanitize(v, depth + 1) for v in obj]
+    value = default(obj)
+    return _sanitize(value, depth + 1) if isinstance(value, (dict, list)) else value
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, default=default, separators=(',', ':'))
+
+
+def _escape_non_ascii(data):
+    """
+    Decodes UTF-8 encoded JSON to an ASCII string, escaping non-ASCII characters like json.dumps does, as \\uXXXX.
+    Non-ASCII characters can only appear within strings, so they are escaped in place. ASCII runs are decoded in C,
+    as well as escaping of the runs of non-ASCII bytes, which always consist of complete UTF-8 sequences.
+    """
+    parts = []
+    start = 0
+    while True:
+        try:
+            parts.append(data[start:].decode('ascii'))
+            return ''.join(parts)
+        except UnicodeDecodeError as error:
+            end = start + error.start
+            parts.append(data[start:end].decode('ascii'))
+            start, end = end, _NON_ASCII_RUN.match(data, end).end()
+            # The run contains no quote or backslash, only the surrounding quotes need to be removed.
+            parts.append(encode_basestring_ascii(data[start:end].decode('utf-8'))[1:-1])
+            start = end
+
+
+def _orjson_dumps(obj):
+    data = orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+    try:
+        return data.decode('ascii')
+    except UnicodeDecodeError:
+        # Keep output ASCII, as the standard library does, so that it can be safely sent as is.
+        return _escape_non_ascii(data)
+
+
+BACKENDS = {
+    'json': _json_dumps
+}
+if orjson is not None:
+    BACKENDS['orjson'] = _orjson_dumps
+
+
+def get_backend(name=AUTO_BACKEND):
+    """
+    Returns the encoding function of a backend.
+    :param str name: the name of the backend. If 'auto', the fastest installed backend is used.
+    :return: a callable accepting an object and returning its JSON representation as string.
+    :rtype: callable
+    """
+    if name == AUTO_BACKEND:
+        return BACKENDS.get('orjson', _json_dumps)
+    if name not in BACKENDS:
+        logger.warning('JSON backend %s is not available, using json', name)
+        return _json_dumps
+    return BACKENDS[name]
+
+
+class JSONEncoder(object):
+    """
+    Encodes payloads using a backend, falling back to the standard library if the backend fails.
+    """
+    def __init__(self, backend=AUTO_BACKEND):
+        """
+        Initialize encoder.
+        :param str backend: the name of the backend to use.
+        """
+        self.backend = backend
+        self._dumps = get_backend(backend)
+
+    def dumps(self, obj, **kwargs):
+        """
+        Encodes an object to JSON. Accepts, and ignores, the keyword arguments of json.dumps, so that it can be used as
+        a replacement of the json module.
+        :param T obj: the object to encode.
+        :return: the JSON document.
+        :rtype: str
+        """
+        try:
+            return self._dumps(obj)
+        except (TypeError, ValueError, OverflowError, RecursionError):
+            return _json_dumps(_sanitize(obj))
+
+    def loads(self, data, **kwargs):
+        return json.loads(data, **kwargs)
@@ -4,17 +4,11 @@ import logging
 from six import iteritems
 
 from flask import request_started, request_tearing_down, got_request_exception
-from flask import current_app, session, request as _request
-from honeybadger import payload
+from flask import current_app, session, has_request_context, jsonify, request as _request
 from honeybadger.utils import filter_dict
 
 from .base import HoneybadgerExtension
-from ._helpers import csv_to_list
-
-DEFAULT_SKIP_HEADERS = ', '.join([
-    'Authorization',
-    'Proxy-Authorization'
-])
+from .config import DEFAULT_SKIP_HEADERS  # noqa: F401
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +18,8 @@ class HoneybadgerFlask(HoneybadgerExtension):
     Flask extension for honeybadger. Initializes honeybadger and adds a flask error handler that notifies honeybadger
     of exceptions.
     """
+    slow_error_class = 'SlowRequest'
+
     def __init__(self, app=None, context_generators={}, report_exceptions=False):
         """
         Initialize Honeybadger.
@@ -35,7 +31,6 @@ class HoneybadgerFlask(HoneybadgerExtension):
         super(HoneybadgerFlask, self).__init__(context_generators=context_generators,
                                                report_exceptions=report_exceptions)
         self.app = app
-        self.skip_headers = []
         if app is not None:
             self.init_app(app, context_generators=context_generators, report_exceptions=report_exceptions)
 
@@ -51,21 +46,34 @@ class HoneybadgerFlask(HoneybadgerExtension):
         self.report_exceptions = report_exceptions
         self.initialize_honeybadger(app.config)
         self._patch_generic_request_payload()
-        self.skip_headers = set(csv_to_list(app.config.get('HONEYBADGER_EXCLUDE_HEADERS', DEFAULT_SKIP_HEADERS)))
-        request_started.connect(self.setup_context, sender=app, weak=False)
-        request_tearing_down.connect(self.reset_context, sender=app, weak=False)
+        # The application keeps the extension alive, while signals reference it weakly. This way, the extension does
+        # not keep the application alive after it is no longer used.
+        app.extensions['honeybadger'] = self
+        request_started.connect(self.setup_context, sender=app)
+        request_tearing_down.connect(self.reset_context, sender=app)
         logger.info('Honeybadger Flask helper installed')
 
+        stats_endpoint = app.config.get('HONEYBADGER_STATS_ENDPOINT')
+        if stats_endpoint:
+            app.add_url_rule(stats_endpoint, 'honeybadger_stats', self._stats_view)
+            logger.info('Exposing Honeybadger statistics at %s', stats_endpoint)
+
         if self.report_exceptions:
             logger.info('Enabling auto-reporting exceptions')
-            got_request_exception.connect(self._handle_exception, sender=app, weak=False)
+            got_request_exception.connect(self._handle_exception, sender=app)
 
     def _patch_generic_request_payload(self):
         """
-        Monkey-patches Honeybadger's generic_request_payload to add information from Flask.
+        Monkey-patches Honeybadger's generic_request_payload to add information from Flask. The wrapper is global, so
+        it uses the extension of the application handling the request, which may not be this one.
         """
         def generic_request_payload_decorator(original):
             def _wrapper(request, context, config):
+                if not has_request_context():
+                    return original(request, context, config)
+                extension = current_app.extensions.get('honeybadger', self)
+                params_filters = extension.params_filters
+                skip_headers = extension.skip_headers
                 current_view = current_app.view_functions[_request.endpoint]
                 if hasattr(current_view, 'view_class'):
                     component = '.'.join((current_view.__module__, current_view.view_class.__name__))
@@ -76,27 +84,48 @@ class HoneybadgerFlask(HoneybadgerExtension):
                     'component': component,
                     'action': _request.endpoint,
                     'params': {},
-                    'session': filter_dict(dict(session), config.params_filters),
+                    'session': filter_dict(dict(session), params_filters),
                     'cgi_data': {
                         k: v
                         for k, v in iteritems(_request.headers)
-                        if k not in self.skip_headers
+                        if k not in skip_headers
                     },
-                    'context': context
+                    'context': extension._payload_context(context)
                 }
 
                 # Add query params
-                params = filter_dict(dict(_request.args), config.params_filters)
-                params.update(filter_dict(dict(_request.form), config.params_filters))
+                params = filter_dict(dict(_request.args), params_filters)
+                params.update(filter_dict(dict(_request.form), params_filters))
                 payload['params'] = params
 
                 return payload
 
             return _wrapper
 
-        payload.generic_request_payload = generic_request_payload_decorator(payload.generic_request_payload)
+        self._install_request_payload(generic_request_payload_decorator)
         logger.info('Monkey-patched generic_request_payload')
 
+    @property
+    def skip_headers(self):
+        """
+        Headers excluded from notices.
+        :rtype: frozenset[str]
+        """
+        return self.reporting.skip_headers
+
+    def _stats_view(self):
+        """
+        View returning the statistics of the extension.
+        """
+        return jsonify(self.stats.snapshot())
+
+    def _current_operation(self):
+        """
+        Returns the endpoint of the current request.
+        :rtype: str
+        """
+        return _request.endpoint if has_request_context() else None
+
     def _handle_exception(self, sender, exception=None):
         """
         Actual code handling the exception and sending it to honeybadger if it's enabled.
@@ -0,0 +1,161 @@
+import os
+import threading
+import weakref
+from bisect import bisect_left
+
+#: upper bounds, in seconds, of histogram buckets. Observations above the last bound fall in an overflow bucket.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram(object):
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """
+        Returns an estimation of a percentile, i.e. the upper bound of the bucket containing it.
+        """
+        if not self.count:
+            return None
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], self.buckets))
+        }
+
+
+class _Shard(object):
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def merge(self, other):
+        for name, value in list(other.counters.items()):
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, histogram in list(other.histograms.items()):
+            self.histograms.setdefault(name, _Histogram()).merge(histogram)
+
+
+class _Sentinel(object):
+    """
+    Object referenced only by a thread's local storage, so that it is collected when the thread exits.
+    """
+    __slots__ = ('__weakref__', )
+
+
+def _retire(registry_ref, shard):
+    registry = registry_ref()
+    if registry is not None:
+        registry._retire(shard)
+
+
+class StatsRegistry(object):
+    """
+    Per-process registry of counters and latency histograms. Each thread updates its own shard, so recording is lock
+    free; shards are only merged when a snapshot is requested. Shards of threads that exited are merged into a single
+    retired shard, so the registry does not grow with thread churn.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            sentinel = self._local.sentinel = _Sentinel()
+            with self._lock:
+                self._shards.append(shard)
+            finalizer = weakref.finalize(sentinel, _retire, weakref.ref(self), shard)
+            finalizer.atexit = False
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards.remove(shard)
+            self._retired.merge(shard)
+
+    def incr(self, name, value=1):
+        """
+        Increments a counter.
+        :param str name: the name of the counter.
+        :param int value: the value to add.
+        """
+        counters = self._shard().counters
+        counters[name] = counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """
+        Records a duration to a histogram.
+        :param str name: the name of the histogram.
+        :param float seconds: the duration in seconds.
+        """
+        histograms = self._shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = _Histogram()
+        histogram.observe(seconds)
+
+    def snapshot(self):
+        """
+        Returns current values of all counters and histograms.
+        :return: a dictionary with keys 'pid', 'counters' and 'histograms'.
+        :rtype: dict
+        """
+        merged = _Shard()
+        with self._lock:
+            merged.merge(self._retired)
+            for shard in self._shards:
+                merged.merge(shard)
+
+        return {
+            'pid': os.getpid(),
+            'counters': merged.counters,
+            'histograms': {name: histogram.to_dict() for name, histogram in merged.histograms.items()}
+        }
+
+    def reset(self):
+        """
+        Resets all counters and histograms.
+        """
+        with self._lock:
+            self._retired = _Shard()
+            for shard in self._shards:
+                shard.counters = {}
+                shard.histograms = {}
@@ -0,0 +1,167 @@
+import hashlib
+import linecache
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from honeybadger import payload as hb_payload
+from honeybadger.version import __version__ as notifier_version
+
+from .backtrace import format_entry
+
+SOURCE_RADIUS = 3
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Notice(namedtuple('Notice', ['error_class', 'message', 'backtrace', 'source', 'request', 'server'])):
+    """
+    Compact, immutable representation of a notice. It contains only pre-formatted data, so it keeps no reference to the
+    exception, its traceback or any frame and can be cheaply queued until it is delivered.
+    """
+    __slots__ = ()
+
+    def to_payload(self):
+        """
+        Returns the payload to send to Honeybadger.
+        :rtype: dict
+        """
+        return {
+            'notifier': {
+                'name': 'Honeybadger for Python',
+                'url': 'https://github.com/honeybadger-io/honeybadger-python',
+                'version': notifier_version
+            },
+            'error': {
+                'class': self.error_class,
+                'message': self.message,
+                'backtrace': list(self.backtrace),
+                'source': dict(self.source)
+            },
+            'server': self.server,
+            'request': self.request
+        }
+
+
+def _traceback_frames(exc_traceback):
+    """
+    Returns (code, line number) pairs of a traceback, innermost frame first.
+    """
+    frames = []
+    while exc_traceback is not None:
+        frames.append((exc_traceback.tb_frame.f_code, exc_traceback.tb_lineno))
+        exc_traceback = exc_traceback.tb_next
+    return reversed(frames)
+
+
+def _stack_frames():
+    """
+    Returns (code, line number) pairs of current stack, innermost frame first, skipping frames of this package.
+    """
+    frame = sys._getframe(1)
+    frames = []
+    while frame is not None:
+        if not frame.f_code.co_filename.startswith(_PACKAGE_DIR):
+            frames.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return frames
+
+
+def format_backtrace(frames, project_root, frame_cache=None):
+    """
+    Formats backtrace entries.
+    :param frames: iterable of (code, line number) pairs, innermost first.
+    :param str project_root: the project root, replaced by [PROJECT_ROOT] in file names.
+    :param honeybadger_extensions.backtrace.FrameCache frame_cache: cache of formatted entries to use, if any.
+    :return: a tuple of backtrace entries.
+    :rtype: tuple[dict]
+    """
+    if frame_cache is not None:
+        return tuple(frame_cache.entry(code, lineno, project_root) for code, lineno in frames)
+    return tuple(format_entry(code, lineno, project_root) for code, lineno in frames)
+
+
+def source_context(filename, lineno, radius=SOURCE_RADIUS):
+    """
+    Returns lines around the given line of a file.
+    :param str filename: the name of the file.
+    :param int lineno: the line number.
+    :param int radius: number of lines to include before and after the line.
+    :return: a dictionary with key the line number and value the line.
+    :rtype: dict[int, str]
+    """
+    lines = linecache.getlines(filename)
+    if not lines:
+        return {}
+    start = max(lineno - radius, 1)
+    end = min(lineno + radius, len(lines))
+    return {number: lines[number - 1] for number in range(start, end + 1)}
+
+
+def error_fingerprint(exception, exc_traceback):
+    """
+    Computes a 64-bit fingerprint of an error, from its class and the location it was raised at. It is cheap to
+    compute, as it does not format anything, and stable across processes.
+    :param Exception|dict exception: the exception, or a dictionary with error_class and error_message.
+    :param traceback exc_traceback: the traceback of the exception, if any.
+    :return: the fingerprint.
+    :rtype: int
+    """
+    if isinstance(exception, dict):
+        error_class = exception['error_class']
+    else:
+        error_class = '%s.%s' % (exception.__class__.__module__, exception.__class__.__name__)
+
+    filename, lineno = '', 0
+    if exc_traceback is not None:
+        while exc_traceback.tb_next is not None:
+            exc_traceback = exc_traceback.tb_next
+        filename, lineno = exc_traceback.tb_frame.f_code.co_filename, exc_traceback.tb_lineno
+
+    key = '%s:%s:%d' % (error_class, filename, lineno)
+    return struct.unpack('<Q', hashlib.sha1(key.encode('utf-8')).digest()[:8])[0]
+
+
+def build_notice(exception, exc_traceback, config, context, request=None, frame_cache=None, local_variables=None):
+    """
+    Creates a notice from an exception. All information needed from the traceback is extracted immediately, so the
+    traceback and its frames are not referenced by the notice.
+    :param Exception|dict exception: the exception, or a dictionary with error_class and error_message.
+    :param traceback exc_traceback: the traceback of the exception. If None, current stack is used.
+    :param honeybadger.config.Configuration config: honeybadger's configuration.
+    :param dict context: the context of the notice.
+    :param T request: the request object, as tracked by honeybadger.
+    :param honeybadger_extensions.backtrace.FrameCache frame_cache: cache of formatted frames to use, if any.
+    :param dict local_variables: captured local variables of failing frames, if any.
+    :return: the notice.
+    :rtype: Notice
+    """
+    if isinstance(exception, dict):
+        error_class = exception['error_class']
+        message = exception['error_message']
+    else:
+        error_class = exception.__class__.__name__
+        message = str(exception)
+
+    frames = list(_traceback_frames(exc_traceback) if exc_traceback is not None else _stack_frames())
+    del exc_traceback
+
+    source = {}
+    if frames:
+        code, lineno = frames[0]
+        if frame_cache is not None:
+            source = frame_cache.source(code, lineno, config.project_root, source_context)
+        else:
+            source = source_context(code.co_filename, lineno)
+
+    request_payload = hb_payload.generic_request_payload(request, context, config)
+    if local_variables:
+        request_payload = dict(request_payload, local_variables=local_variables)
+
+    return Notice(error_class=error_class,
+                  message=message,
+                  backtrace=format_backtrace(frames, config.project_root, frame_cache),
+                  source=source,
+                  request=request_payload,
+                  server=hb_payload.server_payload(config))
@@ -0,0 +1,72 @@
+import threading
+from time import monotonic
+
+DEFAULT_REPORT_INTERVAL = 60.0
+
+
+class SlowOperationMonitor(object):
+    """
+    Times requests or tasks and decides whether a slow operation should be reported. Reports are rate-limited per
+    operation, so a slow endpoint produces at most one notice per interval.
+    """
+    def __init__(self, threshold=None, thresholds=None, interval=DEFAULT_REPORT_INTERVAL):
+        """
+        Initialize monitor.
+        :param float threshold: default threshold in seconds. If None, only operations in thresholds are monitored.
+        :param dict[str, float] thresholds: per operation (endpoint or task name) thresholds in seconds.
+        :param float interval: minimum number of seconds between two reports for the same operation.
+        """
+        self.threshold = threshold
+        self.thresholds = thresholds or {}
+        self.interval = interval
+        self._last_reported = {}
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.threshold is not None or bool(self.thresholds)
+
+    def threshold_for(self, name):
+        """
+        Returns the threshold of an operation.
+        :param str name: the name of the endpoint or task.
+        :return: the threshold in seconds or None if operation is not monitored.
+        :rtype: float
+        """
+        return self.thresholds.get(name, self.threshold)
+
+    def start(self):
+        """
+        Marks the start of an operation in current thread.
+        """
+        self._local.started = monotonic()
+
+    def stop(self):
+        """
+        Marks the end of current thread's operation.
+        :return: the duration of the operation in seconds or None if no operation was started.
+        :rtype: float
+        """
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        if started is None:
+            return None
+        return monotonic() - started
+
+    def should_report(self, name, duration):
+        """
+        Checks whether an operation was slow and has not been reported recently.
+        :param str name: the name of the endpoint or task.
+        :param float duration: the duration of the operation in seconds.
+        :rtype: bool
+        """
+        threshold = self.threshold_for(name)
+        if threshold is None or duration < threshold:
+            return False
+
+        now = monotonic()
+        last_reported = self._last_reported.get(name)
+        if last_reported is not None and now - last_reported < self.interval:
+            return False
+        self._last_reported[name] = now
+        return True
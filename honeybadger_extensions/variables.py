@@ -0,0 +1,167 @@
+"""
+Capture of local variables of failing frames, bounded in size and time so that it is safe to enable in production.
+"""
+import os
+import reprlib
+from itertools import islice
+from time import perf_counter
+
+DEFAULT_MAX_VALUE = 256
+DEFAULT_MAX_TOTAL = 4096
+DEFAULT_TIME_BUDGET = 0.005
+
+FILTERED = '[FILTERED]'
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_LIBRARY_DIRS = ('site-packages', 'dist-packages')
+
+#: modules whose types have a cheap, side effect free repr.
+_SAFE_REPR_MODULES = frozenset(['builtins', 'datetime', 'decimal', 'uuid'])
+
+
+class _FilteringRepr(reprlib.Repr):
+    """
+    Repr with bounded cost, that hides values of filtered keys of dictionaries. Unlike reprlib, dictionaries are not
+    sorted, as sorting large dictionaries is not bounded.
+
+    The repr of arbitrary objects may be slow, huge or have side effects, e.g. lazy loading of ORM relations, so only
+    types of the standard library listed in _SAFE_REPR_MODULES are rendered with repr, unless full_repr is set. Other
+    objects are rendered as their class.
+    """
+    def __init__(self, filters, max_value, full_repr=False):
+        super(_FilteringRepr, self).__init__()
+        self.filters = filters
+        self.full_repr = full_repr
+        self.maxstring = max_value
+        self.maxother = max_value
+        self.maxlong = max_value
+
+    def repr1(self, x, level):
+        if isinstance(x, dict):
+            return self.repr_dict(x, level)
+        return super(_FilteringRepr, self).repr1(x, level)
+
+    def repr_dict(self, x, level):
+        if not x:
+            return '{}'
+        if level <= 0:
+            return '{...}'
+        items = []
+        for key, value in islice(x.items(), self.maxdict):
+            shown = FILTERED if key in self.filters else self.repr1(value, level - 1)
+            items.append('%s: %s' % (self.repr1(key, level - 1), shown))
+        if len(x) > self.maxdict:
+            items.append('...')
+        return '{%s}' % ', '.join(items)
+
+    def repr_bytes(self, x, level):
+        return self.repr_instance(x[:self.maxother], level)
+
+    def repr_bytearray(self, x, level):
+        return self.repr_instance(x[:self.maxother], level)
+
+    def repr_instance(self, x, level):
+        cls = type(x)
+        if not self.full_repr and cls.__module__ not in _SAFE_REPR_MODULES:
+            return '<%s.%s object>' % (cls.__module__, cls.__name__)
+        try:
+            s = repr(x)
+        except Exception:
+            return '<%s instance>' % x.__class__.__name__
+        if len(s) > self.maxother:
+            return s[:self.maxother - 3] + '...'
+        return s
+
+
+def is_application_file(filename, project_root):
+    """
+    Checks whether a file belongs to the application, i.e. it is under the project root and is not an installed
+    library or part of this package.
+    :param str filename: the name of the file.
+    :param str project_root: the project root.
+    :rtype: bool
+    """
+    if not project_root or not filename.startswith(os.path.join(project_root, '')):
+        return False
+    if filename.startswith(_PACKAGE_DIR):
+        return False
+    return not any(directory in filename for directory in _LIBRARY_DIRS)
+
+
+class LocalsCapture(object):
+    """
+    Captures local variables of the innermost application frames of a traceback. Values are filtered like params and
+    rendered with a bounded repr. Capture stops when the size or time budget is exhausted, so a notice may include
+    only part of the variables.
+    """
+    def __init__(self, frames=0, max_value=DEFAULT_MAX_VALUE, max_total=DEFAULT_MAX_TOTAL,
+                 time_budget=DEFAULT_TIME_BUDGET, full_repr=False):
+        """
+        Initialize capture.
+        :param int frames: number of frames to capture locals of, 0 to disable capture.
+        :param int max_value: maximum length of a rendered value.
+        :param int max_total: maximum length of all names and values captured for an error.
+        :param float time_budget: maximum number of seconds spent capturing variables of an error.
+        :param bool full_repr: whether to call the repr of any object, instead of only those of standard types.
+        """
+        self.frames = frames
+        self.max_value = max_value
+        self.max_total = max_total
+        self.time_budget = time_budget
+        self.full_repr = full_repr
+
+    @property
+    def enabled(self):
+        return self.frames > 0
+
+    def _application_frames(self, exc_traceback, project_root):
+        frames = []
+        while exc_traceback is not None:
+            frames.append((exc_traceback.tb_frame, exc_traceback.tb_lineno))
+            exc_traceback = exc_traceback.tb_next
+        selected = []
+        for frame, lineno in reversed(frames):
+            if is_application_file(frame.f_code.co_filename, project_root):
+                selected.append((frame, lineno))
+                if len(selected) == self.frames:
+                    break
+        return selected
+
+    def capture(self, exc_traceback, config, filters=None):
+        """
+        Captures local variables of the failing frames.
+        :param traceback exc_traceback: the traceback of the exception.
+        :param honeybadger.config.Configuration config: honeybadger's configuration, for project root and filters.
+        :param frozenset[str] filters: names of variables and keys to filter, instead of those of the configuration.
+        :return: a dictionary with key the frame, as 'file:line in function', and value a dictionary of rendered
+        variables.
+        :rtype: dict[str, dict[str, str]]
+        """
+        deadline = perf_counter() + self.time_budget
+        project_root = config.project_root
+        if filters is None:
+            filters = frozenset(config.params_filters or ())
+        renderer = _FilteringRepr(filters, self.max_value, full_repr=self.full_repr)
+        remaining = self.max_total
+        captured = {}
+
+        for frame, lineno in self._application_frames(exc_traceback, project_root):
+            code = frame.f_code
+            label = '%s:%d in %s' % (code.co_filename.replace(project_root, '[PROJECT_ROOT]'), lineno, code.co_name)
+            if label in captured:
+                continue
+            variables = captured[label] = {}
+            for name, value in list(frame.f_locals.items()):
+                if remaining <= 0 or perf_counter() > deadline:
+                    return captured
+                if name in filters:
+                    rendered = FILTERED
+                else:
+                    try:
+                        rendered = renderer.repr(value)
+                    except Exception:
+                        rendered = '[unrepresentable]'
+                rendered = rendered[:min(self.max_value, max(remaining - len(name), 0))]
+                variables[name] = rendered
+                remaining -= len(name) + len(rendered)
+        return captured
@@ -138,6 +138,7 @@ setup(
     extras_require={
         'test': test_requirements,
         'celery': ["celery>=4.1.0"],
+        'orjson': ["orjson"],
     },
     test_suite='nose.collector',
     classifiers=[
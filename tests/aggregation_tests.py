@@ -0,0 +1,221 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import flask
+
+from unittest.mock import patch
+from celery import Celery
+
+from honeybadger_extensions import HoneybadgerFlask, install_celery_handler, uninstall_celery_handler
+from honeybadger_extensions.aggregation import ErrorAggregator
+from honeybadger_extensions.notice import Notice
+
+
+def sample_notice(message='boom'):
+    return Notice(error_class='ValueError', message=message, backtrace=(), source={},
+                  request={'context': {'user': 'bilbo'}}, server={})
+
+
+class ErrorAggregatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.summaries = []
+        self.aggregator = ErrorAggregator(60, self.summaries.append, max_groups=2, max_operations=2)
+        self.addCleanup(self.aggregator.close)
+
+    @patch('honeybadger_extensions.aggregation.time.time')
+    def test_summary(self, mock_time):
+        mock_time.return_value = 0
+        self.assertFalse(self.aggregator.record(1, 'orders'))
+        self.aggregator.set_sample(1, sample_notice())
+        mock_time.return_value = 30
+        for operation in ('orders', 'users', 'payments', None):
+            self.assertTrue(self.aggregator.record(1, operation))
+
+        self.assertEqual(1, self.aggregator.flush())
+
+        summary = self.summaries[0]
+        self.assertEqual('ValueError', summary.error_class)
+        self.assertEqual('boom (5 occurrences in 60s)', summary.message)
+        self.assertEqual({
+            'occurrences': 5,
+            'first_seen': '1970-01-01T00:00:00Z',
+            'last_seen': '1970-01-01T00:00:30Z',
+            'operations': ['orders', 'users'],
+            'window': 60,
+            'deduplicated': False
+        }, summary.request['context']['aggregation'])
+        self.assertEqual('bilbo', summary.request['context']['user'])
+
+    def test_new_window_after_flush(self):
+        self.assertFalse(self.aggregator.record(1))
+        self.assertTrue(self.aggregator.record(1))
+        self.aggregator.flush()
+
+        self.assertFalse(self.aggregator.record(1))
+
+    def test_single_occurrence_not_summarized(self):
+        self.aggregator.record(1)
+        self.aggregator.set_sample(1, sample_notice())
+
+        self.assertEqual(0, self.aggregator.flush())
+        self.assertEqual([], self.summaries)
+
+    def test_bounded_groups(self):
+        self.assertFalse(self.aggregator.record(1))
+        self.assertFalse(self.aggregator.record(2))
+        self.assertFalse(self.aggregator.record(3))
+        self.assertFalse(self.aggregator.record(3))
+        self.assertTrue(self.aggregator.record(2))
+
+    def test_discard(self):
+        self.aggregator.record(1)
+        self.aggregator.discard(1)
+
+        self.assertFalse(self.aggregator.record(1))
+
+    def test_suppressed_first_occurrence(self):
+        self.assertFalse(self.aggregator.record(1))
+        self.aggregator.suppress(1, sample_notice())
+        self.assertTrue(self.aggregator.record(1))
+
+        self.assertEqual(1, self.aggregator.flush())
+        self.assertEqual(2, self.summaries[0].request['context']['aggregation']['occurrences'])
+        self.assertTrue(self.summaries[0].request['context']['aggregation']['deduplicated'])
+
+    def test_window_closed_by_timer(self):
+        flushed = threading.Event()
+        aggregator = ErrorAggregator(0.05, lambda notice: flushed.set())
+        self.addCleanup(aggregator.close)
+
+        aggregator.record(1)
+        aggregator.set_sample(1, sample_notice())
+        aggregator.record(1)
+
+        self.assertTrue(flushed.wait(5))
+
+    def test_single_flusher_thread(self):
+        flushed = threading.Semaphore(0)
+        aggregator = ErrorAggregator(0.01, lambda notice: flushed.release())
+        self.addCleanup(aggregator.close)
+
+        flushers = set()
+        for _ in range(5):
+            aggregator.record(1)
+            aggregator.set_sample(1, sample_notice())
+            aggregator.record(1)
+            self.assertTrue(flushed.acquire(timeout=5))
+            flushers.add(aggregator._flusher)
+
+        self.assertEqual(1, len(flushers))
+
+    def test_close_stops_flusher(self):
+        self.aggregator.record(1)
+        flusher = self.aggregator._flusher
+        self.aggregator.close()
+        flusher.join(5)
+
+        self.assertFalse(flusher.is_alive())
+        self.assertFalse(self.aggregator.record(1))
+        self.assertTrue(self.aggregator._flusher.is_alive())
+
+
+class FlaskAggregationTestCase(unittest.TestCase):
+
+    @patch('honeybadger.connection.send_notice')
+    def test_storm(self, mock_send_notice):
+        app = flask.Flask(__name__)
+        app.config.update({
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_AGGREGATION_WINDOW': 60
+        })
+        extension = HoneybadgerFlask(app, report_exceptions=True)
+        self.addCleanup(extension.aggregator.close)
+
+        @app.route('/error')
+        def error():
+            return 1 / 0
+
+        client = app.test_client()
+        for i in range(100):
+            client.get('/error')
+
+        self.assertEqual(1, mock_send_notice.call_count)
+        self.assertEqual(99, extension.stats.snapshot()['counters']['aggregated'])
+
+        extension.aggregator.flush()
+
+        self.assertEqual(2, mock_send_notice.call_count)
+        summary = mock_send_notice.call_args[0][1]
+        self.assertEqual('ZeroDivisionError', summary['error']['class'])
+        self.assertIn('100 occurrences', summary['error']['message'])
+        self.assertEqual(['error'], summary['request']['context']['aggregation']['operations'])
+        self.assertEqual(1, extension.stats.snapshot()['counters']['summaries'])
+
+
+class DeduplicatedAggregationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    @patch('honeybadger.connection.send_notice')
+    def test_occurrences_counted_after_deduplication(self, mock_send_notice):
+        app = flask.Flask(__name__)
+        app.config.update({
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_AGGREGATION_WINDOW': 60,
+            'HONEYBADGER_DEDUP_WINDOW': 60,
+            'HONEYBADGER_DEDUP_PATH': os.path.join(self.directory, 'dedup')
+        })
+        extension = HoneybadgerFlask(app, report_exceptions=True)
+        self.addCleanup(extension.aggregator.close)
+
+        @app.route('/error')
+        def error():
+            return 1 / 0
+
+        client = app.test_client()
+        for window in range(3):
+            for i in range(100):
+                client.get('/error')
+            extension.aggregator.flush()
+
+        self.assertEqual(4, mock_send_notice.call_count)
+        aggregations = [call[0][1]['request']['context']['aggregation'] for call in mock_send_notice.call_args_list[1:]]
+        self.assertEqual([100, 100, 100], [aggregation['occurrences'] for aggregation in aggregations])
+        self.assertEqual([False, True, True], [aggregation['deduplicated'] for aggregation in aggregations])
+        counters = extension.stats.snapshot()['counters']
+        self.assertEqual(2, counters['deduplicated'])
+        self.assertEqual(297, counters['aggregated'])
+
+
+class CeleryAggregationTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        uninstall_celery_handler()
+
+    @patch('honeybadger.connection.send_notice')
+    def test_storm(self, mock_send_notice):
+        celery = Celery(__name__)
+        celery.conf.CELERY_ALWAYS_EAGER = True
+        install_celery_handler({'HONEYBADGER_ENVIRONMENT': 'celery_test', 'HONEYBADGER_AGGREGATION_WINDOW': 60,
+                                'HONEYBADGER_API_KEY': 'key'}, report_exceptions=True)
+
+        @celery.task(name='divide')
+        def divide(x, y=1):
+            return x / y
+
+        for i in range(10):
+            divide.apply_async(args=(i, ), kwargs={'y': 0})
+
+        self.assertEqual(1, mock_send_notice.call_count)
+
+        uninstall_celery_handler()
+
+        self.assertEqual(2, mock_send_notice.call_count)
+        aggregation = mock_send_notice.call_args[0][1]['request']['context']['aggregation']
+        self.assertEqual(10, aggregation['occurrences'])
+        self.assertEqual(['divide'], aggregation['operations'])
@@ -0,0 +1,262 @@
+import asyncio
+import gc
+import json
+import logging
+import threading
+import unittest
+import weakref
+
+from unittest.mock import patch
+from honeybadger import honeybadger
+
+from honeybadger_extensions.aio import send_notice, running_loop, ssl_context
+from honeybadger_extensions.base import HoneybadgerExtension
+
+
+class StandInServer(object):
+    """
+    Local stand-in for honeybadger's API, recording the requests it receives.
+    """
+    def __init__(self, status=201):
+        self.status = status
+        self.requests = []
+        self.server = None
+
+    async def handle(self, reader, writer):
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        headers = dict(line.split(': ', 1) for line in lines[1:] if line)
+        body = await reader.readexactly(int(headers['Content-Length']))
+        self.requests.append((lines[0], headers, json.loads(body.decode('utf-8'))))
+        writer.write(('HTTP/1.1 %d Status\r\nContent-Length: 0\r\n\r\n' % self.status).encode('latin-1'))
+        await writer.drain()
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return 'http://127.0.0.1:%d' % self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def run(coroutine):
+    """
+    Runs a coroutine like asyncio.run, which is not available before Python 3.7.
+    """
+    if hasattr(asyncio, 'run'):
+        return asyncio.run(coroutine)
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        tasks = asyncio.Task.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+
+class AsyncDeliveryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.server = StandInServer()
+        self.endpoint = self.loop.run_until_complete(self.server.start())
+        self.addCleanup(self.loop.run_until_complete, self.server.stop())
+
+        previous = {'endpoint': honeybadger.config.endpoint, 'environment': honeybadger.config.environment,
+                    'api_key': honeybadger.config.api_key}
+        honeybadger.configure(api_key='async', environment='production', endpoint=self.endpoint)
+        self.addCleanup(honeybadger.configure, **previous)
+
+        self.extension = HoneybadgerExtension()
+        self.extension.initialize_honeybadger({'HONEYBADGER_ASYNC_QUEUE_SIZE': 2})
+        self.addCleanup(self.run_async, self.extension.async_notifiers.close())
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_running_loop(self):
+        async def get():
+            return running_loop()
+
+        self.assertIsNone(running_loop())
+        self.assertIs(self.run_async(get()), self.loop)
+
+    def test_send_notice(self):
+        status = self.run_async(send_notice(honeybadger.config, {'error': {'class': 'ValueError'}}))
+
+        self.assertEqual(201, status)
+        request_line, headers, body = self.server.requests[0]
+        self.assertEqual('POST /v1/notices/ HTTP/1.1', request_line)
+        self.assertEqual('async', headers['X-Api-Key'])
+        self.assertEqual('application/json', headers['Content-Type'])
+        self.assertEqual({'error': {'class': 'ValueError'}}, body)
+
+    def test_send_notice_through_proxy(self):
+        honeybadger.configure(endpoint='http://api.honeybadger.invalid')
+
+        with patch.dict('os.environ', {'http_proxy': self.endpoint, 'no_proxy': ''}):
+            status = self.run_async(send_notice(honeybadger.config, {'error': {'class': 'ValueError'}}))
+
+        self.assertEqual(201, status)
+        request_line, headers, body = self.server.requests[0]
+        self.assertEqual('POST http://api.honeybadger.invalid/v1/notices/ HTTP/1.1', request_line)
+        self.assertEqual('async', headers['X-Api-Key'])
+        self.assertEqual({'error': {'class': 'ValueError'}}, body)
+
+    def test_ssl_context_created_once(self):
+        self.assertIs(ssl_context(), ssl_context())
+
+    def test_notify_async(self):
+        try:
+            raise ValueError('from coroutine')
+        except ValueError as e:
+            exception = e
+
+        self.assertTrue(self.run_async(self.extension.notify_async(exception, context={'user': 'bilbo'})))
+
+        body = self.server.requests[0][2]
+        self.assertEqual('ValueError', body['error']['class'])
+        self.assertEqual('from coroutine', body['error']['message'])
+        self.assertEqual({'user': 'bilbo'}, body['request']['context'])
+        self.assertEqual(1, self.extension.stats.snapshot()['counters']['delivered'])
+
+    def test_notify_async_error_response(self):
+        self.server.status = 500
+
+        self.assertFalse(self.run_async(self.extension.notify_async({'error_class': 'Error', 'error_message': 'x'})))
+        self.assertEqual(1, self.extension.stats.snapshot()['counters']['failed'])
+
+    @patch('honeybadger.connection.send_notice')
+    def test_handle_exception_in_running_loop(self, mock_send):
+        async def handle():
+            try:
+                raise ValueError('queued')
+            except ValueError as e:
+                self.extension.handle_exception(e)
+            self.assertEqual([], self.server.requests)
+            await self.extension.async_notifiers.close()
+
+        self.run_async(handle())
+
+        mock_send.assert_not_called()
+        self.assertEqual('queued', self.server.requests[0][2]['error']['message'])
+
+    @patch('honeybadger.connection.send_notice')
+    def test_handle_exception_without_loop(self, mock_send):
+        self.extension.handle_exception(ValueError('sync'))
+
+        self.assertEqual(1, mock_send.call_count)
+        self.assertEqual([], self.server.requests)
+
+    def test_drops_when_queue_full(self):
+        async def handle():
+            for i in range(5):
+                self.extension.handle_exception({'error_class': 'Error', 'error_message': str(i)})
+            await self.extension.async_notifiers.get(self.loop).flush()
+
+        self.run_async(handle())
+
+        counters = self.extension.stats.snapshot()['counters']
+        self.assertEqual(3, counters['dropped'])
+        self.assertEqual(2, counters['delivered'])
+        self.assertEqual(['0', '1'], [body['error']['message'] for _, _, body in self.server.requests])
+
+    @patch('honeybadger.connection.send_notice')
+    def test_async_delivery_disabled(self, mock_send):
+        self.extension.initialize_honeybadger({'HONEYBADGER_ASYNC_DELIVERY': 'false'})
+
+        async def handle():
+            self.extension.handle_exception({'error_class': 'Error', 'error_message': 'blocking'})
+
+        self.run_async(handle())
+
+        self.assertEqual(1, mock_send.call_count)
+
+    def test_close_stops_worker(self):
+        async def handle():
+            self.extension.handle_exception({'error_class': 'Error', 'error_message': 'closing'})
+            notifier = self.extension.async_notifiers.get(self.loop)
+            await self.extension.async_notifiers.close()
+            await asyncio.sleep(0)
+            return notifier
+
+        notifier = self.run_async(handle())
+
+        self.assertTrue(notifier.worker.done())
+        self.assertEqual('closing', self.server.requests[0][2]['error']['message'])
+
+
+class LoopShutdownTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.server_loop = asyncio.new_event_loop()
+        endpoint = self.server_loop.run_until_complete(self.server.start())
+        thread = threading.Thread(target=self.server_loop.run_forever)
+        thread.start()
+
+        def stop():
+            self.server_loop.call_soon_threadsafe(self.server_loop.stop)
+            thread.join()
+            self.server_loop.run_until_complete(self.server.stop())
+            self.server_loop.close()
+        self.addCleanup(stop)
+
+        previous = {'endpoint': honeybadger.config.endpoint, 'environment': honeybadger.config.environment,
+                    'api_key': honeybadger.config.api_key}
+        honeybadger.configure(api_key='async', environment='production', endpoint=endpoint)
+        self.addCleanup(honeybadger.configure, **previous)
+
+        self.extension = HoneybadgerExtension()
+        self.extension.initialize_honeybadger({})
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_queued_notices_sent_on_shutdown(self):
+        loops = []
+
+        async def handle():
+            loops.append(weakref.ref(running_loop()))
+            for i in range(5):
+                self.extension.handle_exception({'error_class': 'Error', 'error_message': str(i)})
+
+        run(handle())
+        gc.collect()
+
+        self.assertEqual(['0', '1', '2', '3', '4'], [body['error']['message'] for _, _, body in self.server.requests])
+        self.assertEqual(5, self.extension.stats.snapshot()['counters']['delivered'])
+        self.assertEqual({}, self.extension.async_notifiers._notifiers)
+        self.assertIsNone(loops[0]())
+
+    def test_undelivered_notices_counted_as_dropped(self):
+        self.extension.initialize_honeybadger({'HONEYBADGER_ASYNC_TIMEOUT': 0})
+
+        async def handle():
+            for i in range(3):
+                self.extension.handle_exception({'error_class': 'Error', 'error_message': str(i)})
+
+        run(handle())
+
+        self.assertEqual(3, self.extension.stats.snapshot()['counters']['dropped'])
+        self.assertEqual({}, self.extension.async_notifiers._notifiers)
+
+    def test_closed_loop_forgotten(self):
+        loop = asyncio.new_event_loop()
+
+        async def handle():
+            self.extension.handle_exception({'error_class': 'Error', 'error_message': 'lost'})
+
+        loop.run_until_complete(handle())
+        loop.close()
+        self.assertEqual(1, len(self.extension.async_notifiers._notifiers))
+        run(handle())
+
+        self.assertEqual(1, self.extension.stats.snapshot()['counters']['dropped'])
+        self.assertEqual({}, self.extension.async_notifiers._notifiers)
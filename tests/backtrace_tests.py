@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from honeybadger_extensions.backtrace import FrameCache
+from honeybadger_extensions.notice import source_context
+
+
+class FrameCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'module.py')
+        self.code = self._write_module('def fail():\n    raise ValueError()\n', 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_module(self, source, mtime):
+        with open(self.filename, 'w') as f:
+            f.write(source)
+        os.utime(self.filename, (mtime, mtime))
+        return compile(source, self.filename, 'exec')
+
+    def test_cached_entry(self):
+        cache = FrameCache()
+
+        entry = cache.entry(self.code, 2, self.directory)
+
+        self.assertEqual({'number': 2, 'file': '[PROJECT_ROOT]/module.py', 'method': '<module>'}, entry)
+        self.assertIs(entry, cache.entry(self.code, 2, self.directory))
+        self.assertIsNot(entry, cache.entry(self.code, 1, self.directory))
+
+    def test_bounded(self):
+        cache = FrameCache(size=2)
+
+        first = cache.entry(self.code, 1, '')
+        cache.entry(self.code, 2, '')
+        cache.entry(self.code, 3, '')
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNot(first, cache.entry(self.code, 1, ''))
+
+    def test_invalidated_on_file_change(self):
+        cache = FrameCache(check_interval=0)
+
+        entry = cache.entry(self.code, 2, '')
+        source = cache.source(self.code, 2, '', source_context)
+        self.assertIn('raise ValueError', source[2])
+
+        self._write_module('def fail():\n    raise KeyError()\n', 2000)
+
+        self.assertIsNot(entry, cache.entry(self.code, 2, ''))
+        self.assertIn('raise KeyError', cache.source(self.code, 2, '', source_context)[2])
@@ -0,0 +1,99 @@
+import logging
+import unittest
+import flask
+
+from unittest.mock import patch
+
+from honeybadger_extensions import HoneybadgerFlask
+from honeybadger_extensions.breadcrumbs import BreadcrumbTrail
+
+
+class BreadcrumbTrailTestCase(unittest.TestCase):
+
+    def test_keeps_latest(self):
+        trail = BreadcrumbTrail(size=3)
+        for i in range(5):
+            trail.add('step %d', args=(i, ))
+
+        self.assertEqual(['step 2', 'step 3', 'step 4'], [b['message'] for b in trail.serialize()])
+
+    def test_clear(self):
+        trail = BreadcrumbTrail(size=3)
+        trail.add('step')
+        trail.clear()
+
+        self.assertEqual(0, len(trail))
+        self.assertEqual([], trail.serialize())
+
+    def test_disabled(self):
+        trail = BreadcrumbTrail(size=0)
+        trail.add('step')
+
+        self.assertEqual([], trail.serialize())
+
+
+class FlaskBreadcrumbsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = flask.Flask(__name__)
+        self.app.config.update({
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_BREADCRUMBS_SIZE': 2
+        })
+        self.logger = logging.getLogger('tests.breadcrumbs')
+        self.logger.setLevel(logging.DEBUG)
+
+    @patch('honeybadger.connection.send_notice')
+    def test_breadcrumbs_sent_with_notice(self, mock_send_notice):
+        extension = HoneybadgerFlask(self.app, report_exceptions=True)
+        handler = extension.breadcrumb_handler()
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+
+        @self.app.route('/error')
+        def error():
+            self.logger.debug('ignored')
+            self.logger.info('first %s', 'message')
+            self.logger.warning('second message')
+            extension.add_breadcrumb('dividing', metadata={'by': 0})
+            return 1 / 0
+
+        self.app.test_client().get('/error')
+
+        context = mock_send_notice.call_args[0][1]['request']['context']
+        self.assertEqual(['second message', 'dividing'], [b['message'] for b in context['breadcrumbs']])
+        self.assertEqual({'logger': 'tests.breadcrumbs', 'level': 'WARNING'}, context['breadcrumbs'][0]['metadata'])
+        self.assertEqual('custom', context['breadcrumbs'][1]['category'])
+        self.assertEqual(0, len(extension.breadcrumbs))
+
+    @patch('honeybadger.connection.send_notice')
+    def test_no_breadcrumbs(self, mock_send_notice):
+        HoneybadgerFlask(self.app, report_exceptions=True)
+
+        @self.app.route('/error')
+        def error():
+            return 1 / 0
+
+        self.app.test_client().get('/error')
+
+        self.assertDictEqual({}, mock_send_notice.call_args[0][1]['request']['context'])
+
+    @patch('honeybadger.connection.send_notice')
+    def test_extension_of_current_app(self, mock_send_notice):
+        self.app.config['HONEYBADGER_EXCLUDE_HEADERS'] = 'X-Secret-One'
+        extension = HoneybadgerFlask(self.app, report_exceptions=True)
+        other = flask.Flask(__name__)
+        other.config.update({'HONEYBADGER_ENVIRONMENT': 'production_flask', 'HONEYBADGER_EXCLUDE_HEADERS': 'X-Two'})
+        HoneybadgerFlask(other, report_exceptions=True)
+
+        @self.app.route('/error')
+        def error():
+            extension.add_breadcrumb('dividing')
+            return 1 / 0
+
+        self.app.test_client().get('/error', headers={'X-Secret-One': 'one', 'X-Two': 'two'})
+
+        request = mock_send_notice.call_args[0][1]['request']
+        self.assertEqual(['dividing'], [b['message'] for b in request['context']['breadcrumbs']])
+        self.assertNotIn('X-Secret-One', request['cgi_data'])
+        self.assertEqual('two', request['cgi_data']['X-Two'])
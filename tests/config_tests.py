@@ -0,0 +1,335 @@
+import json
+import os
+import shutil
+import signal
+import tempfile
+import unittest
+import flask
+
+from unittest.mock import patch
+from celery import Celery
+from honeybadger import honeybadger
+
+from honeybadger_extensions import HoneybadgerFlask, install_celery_handler, uninstall_celery_handler
+from honeybadger_extensions.config import ConfigProvider, compile_config
+
+
+class ConfigFileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'honeybadger.json')
+        self.mtime = 1000
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, content):
+        with open(self.path, 'w') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+        # Modification times may have a coarse resolution, make sure each write changes it.
+        self.mtime += 1
+        os.utime(self.path, (self.mtime, self.mtime))
+
+
+class CompileConfigTestCase(unittest.TestCase):
+
+    def test_defaults(self):
+        config = compile_config({})
+
+        self.assertEqual(frozenset(['password', 'password_confirmation', 'credit_card']), config.params_filters)
+        self.assertEqual(frozenset(['Authorization', 'Proxy-Authorization']), config.skip_headers)
+        self.assertEqual(1.0, config.sample_rate_for('index'))
+        self.assertIsNone(config.slow_threshold)
+
+    def test_compile(self):
+        config = compile_config({
+            'HONEYBADGER_PARAMS_FILTERS': 'secret, token',
+            'HONEYBADGER_EXCLUDE_HEADERS': ['X-Key'],
+            'HONEYBADGER_SAMPLE_RATE': '0.5',
+            'HONEYBADGER_SAMPLE_RATES': 'hot=0.01',
+            'HONEYBADGER_SLOW_THRESHOLDS': {'export': 30}
+        })
+
+        self.assertEqual(frozenset(['secret', 'token']), config.params_filters)
+        self.assertEqual(frozenset(['X-Key']), config.skip_headers)
+        self.assertEqual(0.01, config.sample_rate_for('hot'))
+        self.assertEqual(0.5, config.sample_rate_for('other'))
+        self.assertEqual(0.5, config.sample_rate_for(None))
+        self.assertEqual(30.0, config.slow_thresholds['export'])
+
+    def test_immutable(self):
+        config = compile_config({'HONEYBADGER_SAMPLE_RATES': 'hot=0.01'})
+
+        with self.assertRaises(AttributeError):
+            config.sample_rate = 0
+        with self.assertRaises(TypeError):
+            config.sample_rates['hot'] = 1
+
+
+class ConfigProviderTestCase(ConfigFileTestCase):
+
+    def test_without_file(self):
+        provider = ConfigProvider({'HONEYBADGER_SAMPLE_RATE': 0.5, 'HONEYBADGER_API_KEY': 'key'})
+
+        self.assertEqual(0.5, provider.get().sample_rate)
+        self.assertIs(provider.get(), provider.get())
+
+    def test_reloads_changed_file(self):
+        changes = []
+        self.write({'HONEYBADGER_SAMPLE_RATE': 0.5})
+        provider = ConfigProvider({'HONEYBADGER_SAMPLE_RATE': 1, 'HONEYBADGER_PARAMS_FILTERS': 'secret'},
+                                  path=self.path, interval=0, on_change=changes.append)
+
+        self.assertEqual(0.5, provider.get().sample_rate)
+        self.assertEqual(frozenset(['secret']), provider.get().params_filters)
+
+        self.write({'HONEYBADGER_SAMPLE_RATE': 0.1, 'HONEYBADGER_API_KEY': 'ignored'})
+        self.assertEqual(0.1, provider.get().sample_rate)
+
+        os.remove(self.path)
+        self.assertEqual(1.0, provider.get().sample_rate)
+        self.assertEqual([1.0, 0.5, 0.1, 1.0], [config.sample_rate for config in changes])
+
+    def test_poll_interval(self):
+        self.write({'HONEYBADGER_SAMPLE_RATE': 0.5})
+        provider = ConfigProvider({}, path=self.path, interval=3600)
+
+        self.write({'HONEYBADGER_SAMPLE_RATE': 0.1})
+
+        self.assertEqual(0.5, provider.get().sample_rate)
+
+    def test_invalid_file_keeps_config(self):
+        self.write({'HONEYBADGER_SAMPLE_RATE': 0.5})
+        provider = ConfigProvider({}, path=self.path, interval=0)
+
+        self.write('{"HONEYBADGER_SAMPLE_RATE": ')
+        self.assertEqual(0.5, provider.get().sample_rate)
+        self.write({'HONEYBADGER_SAMPLE_RATE': 'many'})
+        self.assertEqual(0.5, provider.get().sample_rate)
+        self.write(['HONEYBADGER_SAMPLE_RATE'])
+        self.assertEqual(0.5, provider.get().sample_rate)
+
+    def test_reads_do_not_wait_for_reload(self):
+        provider = ConfigProvider({}, path=self.path, interval=0)
+        self.write({'HONEYBADGER_SAMPLE_RATE': 0.5})
+
+        provider._lock.acquire()
+        try:
+            self.assertEqual(1.0, provider.get().sample_rate)
+        finally:
+            provider._lock.release()
+        self.assertEqual(0.5, provider.get().sample_rate)
+
+    def test_reload_on_signal(self):
+        provider = ConfigProvider({}, path=self.path, interval=3600)
+        previous = signal.getsignal(signal.SIGUSR1)
+        self.addCleanup(signal.signal, signal.SIGUSR1, previous)
+        self.assertTrue(provider.install_signal_handler('SIGUSR1'))
+
+        with open(self.path, 'w') as f:
+            json.dump({'HONEYBADGER_SAMPLE_RATE': 0.5}, f)
+        self.assertEqual(1.0, provider.get().sample_rate)
+        os.kill(os.getpid(), signal.SIGUSR1)
+
+        self.assertEqual(0.5, provider.get().sample_rate)
+
+    def test_previous_signal_handler_called(self):
+        received = []
+        previous = signal.signal(signal.SIGUSR2, lambda signum, frame: received.append(signum))
+        self.addCleanup(signal.signal, signal.SIGUSR2, previous)
+        first = ConfigProvider({}, path=self.path, interval=3600)
+        second = ConfigProvider({}, path=self.path, interval=3600)
+        self.assertTrue(first.install_signal_handler('SIGUSR2'))
+        self.assertTrue(second.install_signal_handler('SIGUSR2'))
+
+        with open(self.path, 'w') as f:
+            json.dump({'HONEYBADGER_SAMPLE_RATE': 0.5}, f)
+        os.kill(os.getpid(), signal.SIGUSR2)
+
+        self.assertEqual(0.5, second.get().sample_rate)
+        self.assertEqual([signal.SIGUSR2], received)
+
+    def test_uninstall_signal_handler(self):
+        previous = signal.getsignal(signal.SIGUSR2)
+        self.addCleanup(signal.signal, signal.SIGUSR2, previous)
+        first = ConfigProvider({})
+        second = ConfigProvider({})
+        first.install_signal_handler('SIGUSR2')
+        second.install_signal_handler('SIGUSR2')
+
+        second.uninstall_signal_handler()
+        self.assertEqual(first._request_reload, signal.getsignal(signal.SIGUSR2))
+        first.uninstall_signal_handler()
+        self.assertEqual(previous, signal.getsignal(signal.SIGUSR2))
+
+    def test_unknown_signal(self):
+        self.assertFalse(ConfigProvider({}).install_signal_handler('SIGNOPE'))
+
+
+class FlaskConfigReloadTestCase(ConfigFileTestCase):
+
+    @patch('honeybadger.connection.send_notice')
+    def test_reload(self, mock_send_notice):
+        app = flask.Flask(__name__)
+        app.config.update({
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_PARAMS_FILTERS': 'password',
+            'HONEYBADGER_CONFIG_FILE': self.path,
+            'HONEYBADGER_CONFIG_POLL_INTERVAL': 0
+        })
+        extension = HoneybadgerFlask(app, report_exceptions=True)
+
+        @app.route('/hot')
+        def hot():
+            return 1 / 0
+
+        @app.route('/cold')
+        def cold():
+            return 1 / 0
+
+        client = app.test_client()
+        client.get('/hot?token=abc', headers={'X-Key': 'key'})
+        request = mock_send_notice.call_args[0][1]['request']
+        self.assertEqual('abc', request['params']['token'])
+        self.assertIn('X-Key', request['cgi_data'])
+
+        self.write({
+            'HONEYBADGER_SAMPLE_RATES': {'hot': 0},
+            'HONEYBADGER_PARAMS_FILTERS': 'password, token',
+            'HONEYBADGER_EXCLUDE_HEADERS': 'X-Key'
+        })
+        client.get('/hot?token=abc')
+        self.assertEqual(1, mock_send_notice.call_count)
+        self.assertEqual(1, extension.stats.snapshot()['counters']['sampled_out'])
+
+        client.get('/cold?token=abc', headers={'X-Key': 'key'})
+        self.assertEqual(2, mock_send_notice.call_count)
+        request = mock_send_notice.call_args[0][1]['request']
+        self.assertEqual('[FILTERED]', request['params']['token'])
+        self.assertNotIn('X-Key', request['cgi_data'])
+
+    @patch('honeybadger.connection.send_notice')
+    def test_honeybadger_filters_kept(self, mock_send_notice):
+        previous = {'api_key': honeybadger.config.api_key, 'environment': honeybadger.config.environment,
+                    'params_filters': honeybadger.config.params_filters}
+        self.addCleanup(honeybadger.configure, **previous)
+        with patch.dict('os.environ', {'HONEYBADGER_PARAMS_FILTERS': 'secret_token'}):
+            honeybadger.config.set_12factor_config()
+
+        app = flask.Flask(__name__)
+        app.config.update({
+            'HONEYBADGER_API_KEY': 'key',
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_PARAMS_FILTERS': 'password',
+            'HONEYBADGER_CONFIG_FILE': self.path,
+            'HONEYBADGER_CONFIG_POLL_INTERVAL': 0
+        })
+        HoneybadgerFlask(app, report_exceptions=True)
+
+        @app.route('/e')
+        def error():
+            return 1 / 0
+
+        client = app.test_client()
+        client.get('/e?secret_token=abc&password=def&token=ghi')
+        params = mock_send_notice.call_args[0][1]['request']['params']
+        self.assertEqual({'secret_token': '[FILTERED]', 'password': '[FILTERED]', 'token': 'ghi'}, params)
+
+        self.write({'HONEYBADGER_PARAMS_FILTERS': 'token'})
+        client.get('/e?secret_token=abc&password=def&token=ghi')
+        params = mock_send_notice.call_args[0][1]['request']['params']
+        self.assertEqual({'secret_token': '[FILTERED]', 'password': 'def', 'token': '[FILTERED]'}, params)
+
+
+class SignalReloadTestCase(ConfigFileTestCase):
+
+    def setUp(self):
+        super(SignalReloadTestCase, self).setUp()
+        self.received = []
+        previous = signal.signal(signal.SIGUSR2, lambda signum, frame: self.received.append(signum))
+        self.addCleanup(signal.signal, signal.SIGUSR2, previous)
+
+    def extension(self):
+        app = flask.Flask(__name__)
+        app.config.update({
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_CONFIG_FILE': self.path,
+            'HONEYBADGER_CONFIG_POLL_INTERVAL': 3600,
+            'HONEYBADGER_RELOAD_SIGNAL': 'SIGUSR2'
+        })
+        return app, HoneybadgerFlask(app)
+
+    def test_all_extensions_reload(self):
+        extensions = [self.extension()[1], self.extension()[1]]
+
+        with open(self.path, 'w') as f:
+            json.dump({'HONEYBADGER_SAMPLE_RATE': 0.5}, f)
+        os.kill(os.getpid(), signal.SIGUSR2)
+
+        self.assertEqual([0.5, 0.5], [extension.reporting.sample_rate for extension in extensions])
+        self.assertEqual([signal.SIGUSR2], self.received)
+
+    def test_initialized_again(self):
+        app, extension = self.extension()
+        for _ in range(3):
+            extension.init_app(app)
+
+        with open(self.path, 'w') as f:
+            json.dump({'HONEYBADGER_SAMPLE_RATE': 0.5}, f)
+        os.kill(os.getpid(), signal.SIGUSR2)
+
+        self.assertEqual(0.5, extension.reporting.sample_rate)
+        self.assertEqual([signal.SIGUSR2], self.received)
+        handler = signal.getsignal(signal.SIGUSR2)
+        self.assertIs(extension.config_provider, handler.__self__)
+        self.assertNotIsInstance(getattr(handler.__self__._previous_handler, '__self__', None), ConfigProvider)
+
+
+class CeleryConfigReloadTestCase(ConfigFileTestCase):
+
+    def tearDown(self):
+        uninstall_celery_handler()
+        super(CeleryConfigReloadTestCase, self).tearDown()
+
+    @patch('honeybadger.connection.send_notice')
+    def test_sample_rates(self, mock_send_notice):
+        celery = Celery(__name__)
+        celery.conf.CELERY_ALWAYS_EAGER = True
+        install_celery_handler({'HONEYBADGER_ENVIRONMENT': 'celery_test', 'HONEYBADGER_API_KEY': 'key',
+                                'HONEYBADGER_CONFIG_FILE': self.path, 'HONEYBADGER_CONFIG_POLL_INTERVAL': 0},
+                               report_exceptions=True)
+
+        @celery.task(name='divide')
+        def divide(x, y=1):
+            return x / y
+
+        divide.apply_async(args=(1, ), kwargs={'y': 0})
+        self.assertEqual(1, mock_send_notice.call_count)
+
+        self.write({'HONEYBADGER_SAMPLE_RATE': 0})
+        divide.apply_async(args=(1, ), kwargs={'y': 0})
+        self.assertEqual(1, mock_send_notice.call_count)
+
+        self.write({'HONEYBADGER_SAMPLE_RATE': 0, 'HONEYBADGER_SAMPLE_RATES': 'divide=1'})
+        divide.apply_async(args=(1, ), kwargs={'y': 0})
+        self.assertEqual(2, mock_send_notice.call_count)
+
+    @patch('honeybadger.connection.send_notice')
+    def test_filters_reach_local_variables(self, mock_send_notice):
+        celery = Celery(__name__)
+        celery.conf.CELERY_ALWAYS_EAGER = True
+        install_celery_handler({'HONEYBADGER_ENVIRONMENT': 'celery_test', 'HONEYBADGER_CAPTURE_LOCALS': 1,
+                                'HONEYBADGER_CONFIG_FILE': self.path, 'HONEYBADGER_CONFIG_POLL_INTERVAL': 0},
+                               report_exceptions=True)
+
+        @celery.task(name='divide')
+        def divide(x, y=1):
+            ratio = 'x/y'  # noqa: F841
+            return x / y
+
+        self.write({'HONEYBADGER_PARAMS_FILTERS': 'ratio'})
+        divide.apply_async(args=(1, ), kwargs={'y': 0})
+
+        local_variables = mock_send_notice.call_args[0][1]['request']['local_variables']
+        self.assertEqual('[FILTERED]', list(local_variables.values())[0]['ratio'])
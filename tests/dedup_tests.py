@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+import flask
+
+from unittest.mock import patch
+
+from honeybadger_extensions import HoneybadgerFlask
+from honeybadger_extensions.dedup import SharedDeduplicator, default_path
+
+
+def _seen_in_child(path, fingerprint, results):
+    results.put(SharedDeduplicator(60, path=path, slots=16).seen(fingerprint))
+
+
+class SharedDeduplicatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'dedup')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_duplicate_within_window(self):
+        first = SharedDeduplicator(60, path=self.path, slots=16)
+        second = SharedDeduplicator(60, path=self.path, slots=16)
+
+        self.assertFalse(first.seen(42))
+        self.assertTrue(first.seen(42))
+        self.assertTrue(second.seen(42))
+        self.assertFalse(second.seen(43))
+
+    @patch('honeybadger_extensions.dedup.time.time')
+    def test_expires(self, mock_time):
+        deduplicator = SharedDeduplicator(60, path=self.path, slots=16)
+
+        mock_time.return_value = 1000
+        self.assertFalse(deduplicator.seen(42))
+        mock_time.return_value = 1059
+        self.assertTrue(deduplicator.seen(42))
+        mock_time.return_value = 1061
+        self.assertFalse(deduplicator.seen(42))
+
+    def test_bounded(self):
+        deduplicator = SharedDeduplicator(60, path=self.path, slots=4, probes=2)
+        for fingerprint in range(1, 100):
+            deduplicator.seen(fingerprint)
+
+        self.assertEqual(4 * 16, os.path.getsize(self.path))
+        self.assertTrue(deduplicator.seen(99))
+
+    def test_shared_between_processes(self):
+        SharedDeduplicator(60, path=self.path, slots=16).seen(42)
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_seen_in_child, args=(self.path, fingerprint, results))
+                     for fingerprint in (42, 43)]
+        for process in processes:
+            process.start()
+            process.join()
+
+        self.assertEqual({True, False}, {results.get(timeout=5), results.get(timeout=5)})
+
+    def test_unavailable_table(self):
+        deduplicator = SharedDeduplicator(60, path=os.path.join(self.directory, 'missing', 'dedup'))
+
+        self.assertFalse(deduplicator.seen(42))
+        self.assertFalse(deduplicator.seen(42))
+
+    def test_refuses_symlink(self):
+        target = os.path.join(self.directory, 'target')
+        with open(target, 'wb') as f:
+            f.write(b'keep')
+        os.symlink(target, self.path)
+        deduplicator = SharedDeduplicator(60, path=self.path, slots=16)
+
+        self.assertFalse(deduplicator.seen(42))
+        self.assertFalse(deduplicator.seen(42))
+        with open(target, 'rb') as f:
+            self.assertEqual(b'keep', f.read())
+
+    @patch('honeybadger_extensions.dedup.os.getuid', return_value=12345)
+    def test_refuses_file_of_other_user(self, mock_getuid):
+        deduplicator = SharedDeduplicator(60, path=self.path, slots=16)
+
+        self.assertFalse(deduplicator.seen(42))
+        self.assertFalse(deduplicator.seen(42))
+
+    def test_default_path(self):
+        path = default_path('/srv/app', 'production')
+
+        self.assertIn('-%d-' % os.getuid(), os.path.basename(path))
+        self.assertEqual(path, default_path('/srv/app', 'production'))
+        self.assertNotEqual(path, default_path('/srv/other', 'production'))
+        self.assertNotEqual(path, default_path('/srv/app', 'staging'))
+
+
+class FlaskDeduplicationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @patch('honeybadger.connection.send_notice')
+    def test_reports_once(self, mock_send_notice):
+        app = flask.Flask(__name__)
+        app.config.update({
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_DEDUP_WINDOW': 60,
+            'HONEYBADGER_DEDUP_PATH': os.path.join(self.directory, 'dedup')
+        })
+        extension = HoneybadgerFlask(app, report_exceptions=True)
+
+        @app.route('/error')
+        def error():
+            return 1 / 0
+
+        @app.route('/other')
+        def other():
+            return {}['missing']
+
+        client = app.test_client()
+        client.get('/error')
+        client.get('/error?a=1')
+        client.get('/other')
+
+        self.assertEqual(2, mock_send_notice.call_count)
+        self.assertEqual(1, extension.stats.snapshot()['counters']['deduplicated'])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks encoding of realistic Flask and Celery notice payloads with honeybadger's encoder and the available backends
+of honeybadger_extensions.encoding.
+
+Run with:
+
+    python -m tests.encoding_benchmarks [iterations]
+"""
+import datetime
+import decimal
+import json
+import sys
+import timeit
+import uuid
+
+from honeybadger.utils import StringReprJSONEncoder
+
+from honeybadger_extensions.encoding import JSONEncoder, BACKENDS
+
+
+def _backtrace(frames=40):
+    return [
+        {'number': 100 + i, 'file': '[PROJECT_ROOT]/app/module_%d.py' % i, 'method': 'function_%d' % i}
+        for i in range(frames)
+    ]
+
+
+def _server():
+    return {
+        'project_root': '/srv/app',
+        'environment_name': 'production',
+        'hostname': 'web-1',
+        'time': '2018-01-02T03:04:05Z',
+        'pid': 1234,
+        'stats': {'mem': {'total': 16000.0, 'free': 2000.0}, 'load': {'one': 0.5, 'five': 0.4, 'fifteen': 0.3}}
+    }
+
+
+def flask_payload():
+    headers = {'X-Header-%d' % i: 'value-%d' % i * 4 for i in range(30)}
+    headers.update({'Host': 'localhost', 'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64)'})
+    return {
+        'error': {'class': 'ZeroDivisionError', 'message': 'division by zero', 'backtrace': _backtrace(),
+                  'source': {i: '    line %d of source\n' % i for i in range(10, 17)}},
+        'server': _server(),
+        'request': {
+            'url': 'http://localhost/orders',
+            'component': 'app.views',
+            'action': 'orders.create',
+            'params': {'field_%d' % i: ['value %d' % i] for i in range(50)},
+            'session': {'user_id': 42, 'last_seen': datetime.datetime(2018, 1, 2, 3, 4, 5), 'csrf': 'a' * 40},
+            'cgi_data': headers,
+            'context': {'request-id': str(uuid.uuid4()), 'user': 'bilbo'}
+        }
+    }
+
+
+def flask_non_ascii_payload():
+    payload = flask_payload()
+    payload['request']['cgi_data']['Accept-Language'] = 'el-GR,el;q=0.9,en;q=0.8'
+    payload['request']['context']['user'] = u'Γιώργος Παπαδόπουλος'
+    return payload
+
+
+def celery_payload():
+    return {
+        'error': {'class': 'ValueError', 'message': 'invalid order', 'backtrace': _backtrace(),
+                  'source': {i: '    line %d of source\n' % i for i in range(10, 17)}},
+        'server': _server(),
+        'request': {
+            'component': 'app.tasks',
+            'action': 'app.tasks.process_order',
+            'params': {
+                'args': [uuid.uuid4(), decimal.Decimal('12.50'), datetime.date(2018, 1, 2)],
+                'kwargs': {'items': [{'sku': 'SKU-%d' % i, 'price': decimal.Decimal('9.99'), 'quantity': i}
+                                     for i in range(100)]}
+            },
+            'cgi_data': {'task_id': str(uuid.uuid4()), 'retries': 0, 'max_retries': 3},
+            'context': {'ringbearer': 'frodo'}
+        }
+    }
+
+
+def main(iterations=2000):
+    encoders = [('honeybadger', lambda payload: json.dumps(payload, cls=StringReprJSONEncoder))]
+    encoders.extend((name, JSONEncoder(name).dumps) for name in sorted(BACKENDS))
+
+    print('%-10s %-12s %12s %10s' % ('payload', 'encoder', 'usec/op', 'bytes'))
+    payloads = (('flask', flask_payload), ('flask-utf8', flask_non_ascii_payload), ('celery', celery_payload))
+    for payload_name, factory in payloads:
+        payload = factory()
+        for encoder_name, dumps in encoders:
+            seconds = min(timeit.repeat(lambda: dumps(payload), number=iterations, repeat=3))
+            usec = seconds / iterations * 1e6
+            print('%-10s %-12s %12.1f %10d' % (payload_name, encoder_name, usec, len(dumps(payload))))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
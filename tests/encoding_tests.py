@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import datetime
+import decimal
+import json
+import unittest
+import uuid
+from unittest.mock import patch
+
+import honeybadger.connection as connection
+from honeybadger.utils import StringReprJSONEncoder
+
+from honeybadger_extensions.base import HoneybadgerExtension
+from honeybadger_extensions.encoding import JSONEncoder, BACKENDS
+
+
+class Model(object):
+    def __repr__(self):
+        return '<Model 1>'
+
+
+class EncodingTestCase(unittest.TestCase):
+
+    payload = {
+        'params': {
+            'args': [datetime.datetime(2018, 1, 2, 3, 4, 5), decimal.Decimal('1.50'), Model()],
+            'kwargs': {
+                'id': uuid.UUID('12345678123456781234567812345678'),
+                'tags': {'a'},
+                'raw': b'bytes',
+                'date': datetime.date(2018, 1, 2)
+            }
+        },
+        'source': {1: 'line'}
+    }
+
+    expected = {
+        'params': {
+            'args': ['2018-01-02T03:04:05', '1.50', '<Model 1>'],
+            'kwargs': {
+                'id': '12345678-1234-5678-1234-567812345678',
+                'tags': ['a'],
+                'raw': 'bytes',
+                'date': '2018-01-02'
+            }
+        },
+        'source': {'1': 'line'}
+    }
+
+    def _assert_backend(self, backend):
+        encoded = JSONEncoder(backend).dumps(self.payload)
+
+        self.assertDictEqual(self.expected, json.loads(encoded))
+
+    def test_json_backend(self):
+        self._assert_backend('json')
+
+    @unittest.skipUnless('orjson' in BACKENDS, 'orjson is not installed')
+    def test_orjson_backend(self):
+        self._assert_backend('orjson')
+
+    def test_unknown_backend(self):
+        self._assert_backend('unknown')
+
+    def test_ascii_output(self):
+        for backend in BACKENDS:
+            encoded = JSONEncoder(backend).dumps({'name': u'Μπίλμπο'})
+            encoded.encode('ascii')
+            self.assertEqual({'name': u'Μπίλμπο'}, json.loads(encoded))
+
+    @unittest.skipUnless('orjson' in BACKENDS, 'orjson is not installed')
+    def test_orjson_escapes_non_ascii(self):
+        payload = {'name': u'Μπίλμπο', 'emoji': u'\U0001F600', 'keys': {u'κλειδί': u'é\u2028'}}
+
+        with patch('honeybadger_extensions.encoding._json_dumps') as mock_json_dumps:
+            encoded = JSONEncoder('orjson').dumps(payload)
+
+        mock_json_dumps.assert_not_called()
+        self.assertEqual(json.dumps(payload, separators=(',', ':')), encoded)
+
+    def test_circular_reference(self):
+        circular = {'a': 1}
+        circular['self'] = circular
+
+        for backend in BACKENDS:
+            decoded = json.loads(JSONEncoder(backend).dumps(circular))
+            self.assertEqual(1, decoded['a'])
+
+    def test_patches_connection(self):
+        HoneybadgerExtension().initialize_honeybadger({'HONEYBADGER_JSON_BACKEND': 'json'})
+
+        encoded = connection.json.dumps(self.payload, cls=StringReprJSONEncoder)
+
+        self.assertDictEqual(self.expected, json.loads(encoded))
@@ -0,0 +1,119 @@
+import json
+import threading
+import unittest
+import flask
+
+from unittest.mock import patch
+from celery import Celery
+from celery.worker.control import Panel
+
+from honeybadger_extensions import HoneybadgerFlask, celery_handler, install_celery_handler, uninstall_celery_handler
+from honeybadger_extensions.metrics import StatsRegistry
+
+
+class StatsRegistryTestCase(unittest.TestCase):
+
+    def test_counters_across_threads(self):
+        stats = StatsRegistry()
+
+        def work():
+            for _ in range(100):
+                stats.incr('attempted')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats.incr('failed', 2)
+
+        self.assertEqual({'attempted': 400, 'failed': 2}, stats.snapshot()['counters'])
+
+    def test_exited_threads_retired(self):
+        stats = StatsRegistry()
+
+        def work():
+            stats.incr('attempted')
+            stats.observe('delivery_latency', 0.1)
+
+        for _ in range(50):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        self.assertLessEqual(len(stats._shards), 1)
+        snapshot = stats.snapshot()
+        self.assertEqual({'attempted': 50}, snapshot['counters'])
+        self.assertEqual(50, snapshot['histograms']['delivery_latency']['count'])
+
+    def test_histograms(self):
+        stats = StatsRegistry()
+        for value in (0.0002, 0.0003, 0.004, 20):
+            stats.observe('delivery_latency', value)
+
+        histogram = stats.snapshot()['histograms']['delivery_latency']
+        self.assertEqual(4, histogram['count'])
+        self.assertEqual(20, histogram['max'])
+        self.assertEqual(0.0005, histogram['p50'])
+        self.assertEqual(20, histogram['p99'])
+        self.assertEqual(1, histogram['buckets']['+Inf'])
+
+    def test_reset(self):
+        stats = StatsRegistry()
+        stats.incr('attempted')
+        stats.observe('delivery_latency', 0.1)
+        stats.reset()
+
+        self.assertEqual({}, stats.snapshot()['counters'])
+        self.assertEqual({}, stats.snapshot()['histograms'])
+
+
+class FlaskStatsTestCase(unittest.TestCase):
+
+    @patch('honeybadger.connection.send_notice')
+    def test_stats_endpoint(self, mock_send_notice):
+        mock_send_notice.side_effect = [None, IOError('Connection refused')]
+        app = flask.Flask(__name__)
+        app.config.update({
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_STATS_ENDPOINT': '/_honeybadger/stats'
+        })
+        HoneybadgerFlask(app, report_exceptions=True)
+
+        @app.route('/error')
+        def error():
+            return 1 / 0
+
+        client = app.test_client()
+        client.get('/error')
+        client.get('/error')
+        stats = json.loads(client.get('/_honeybadger/stats').data.decode('utf-8'))
+
+        self.assertEqual({'attempted': 2, 'handed_off': 1, 'failed': 1}, stats['counters'])
+        self.assertEqual(2, stats['histograms']['payload_build_time']['count'])
+        self.assertEqual(2, stats['histograms']['handoff_latency']['count'])
+
+
+class CeleryStatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        celery_handler.stats.reset()
+
+    def tearDown(self):
+        uninstall_celery_handler()
+
+    @patch('honeybadger.connection.send_notice')
+    def test_inspect_command(self, mock_send_notice):
+        celery = Celery(__name__)
+        celery.conf.CELERY_ALWAYS_EAGER = True
+        install_celery_handler({'HONEYBADGER_STATS_INSPECT': True}, report_exceptions=True)
+
+        @celery.task
+        def dummy_task(x, y=1):
+            return x / y
+
+        dummy_task.apply_async(args=(1, ), kwargs={'y': 0})
+        stats = Panel.data['honeybadger_stats'](None)
+
+        self.assertEqual(1, stats['counters']['attempted'])
+        self.assertEqual(1, stats['counters']['handed_off'])
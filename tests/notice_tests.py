@@ -0,0 +1,69 @@
+import gc
+import unittest
+import weakref
+
+from honeybadger import honeybadger
+
+from honeybadger_extensions.base import HoneybadgerExtension
+
+
+class Payload(object):
+    pass
+
+
+def fail(payload):
+    raise ValueError('bad payload')
+
+
+class NoticeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.extension = HoneybadgerExtension()
+
+    def tearDown(self):
+        honeybadger.reset_context()
+
+    def test_notice_from_exception(self):
+        honeybadger.set_context(ringbearer='frodo')
+        try:
+            fail(Payload())
+        except ValueError as e:
+            notice = self.extension.build_notice(e, context={'q': 3})
+
+        self.assertEqual('ValueError', notice.error_class)
+        self.assertEqual('bad payload', notice.message)
+        self.assertEqual('fail', notice.backtrace[0]['method'])
+        self.assertEqual('test_notice_from_exception', notice.backtrace[1]['method'])
+        self.assertIn(notice.backtrace[0]['number'], notice.source)
+        self.assertIn('raise ValueError', notice.source[notice.backtrace[0]['number']])
+        self.assertEqual({'ringbearer': 'frodo', 'q': 3}, notice.request['context'])
+        self.assertEqual({'ringbearer': 'frodo'}, honeybadger._get_context())
+
+        payload = notice.to_payload()
+        self.assertEqual('ValueError', payload['error']['class'])
+        self.assertEqual(list(notice.backtrace), payload['error']['backtrace'])
+
+    def test_notice_without_exception(self):
+        notice = self.extension.build_notice({'error_class': 'Custom', 'error_message': 'something happened'})
+
+        self.assertEqual('Custom', notice.error_class)
+        self.assertEqual('test_notice_without_exception', notice.backtrace[0]['method'])
+
+    def test_notice_is_immutable(self):
+        notice = self.extension.build_notice({'error_class': 'Custom', 'error_message': 'something happened'})
+
+        with self.assertRaises(AttributeError):
+            notice.message = 'changed'
+
+    def test_frames_are_released(self):
+        payload = Payload()
+        reference = weakref.ref(payload)
+        try:
+            fail(payload)
+        except ValueError as e:
+            notice = self.extension.build_notice(e)
+        del payload
+        gc.collect()
+
+        self.assertIsNone(reference())
+        self.assertEqual('bad payload', notice.message)
@@ -0,0 +1,217 @@
+"""
+Measures the overhead of HoneybadgerFlask and the Celery failure handler per request, task and notice.
+
+Each scenario runs the same operation against a Flask test client or an eager Celery task, once without the extension
+(baseline) and once with it. Notices are sent to a local fake collector that encodes them, like the real connection
+does, instead of sending them over the network.
+
+Run with:
+
+    python -m tests.overhead_benchmarks [-n ITERATIONS] [SCENARIO ...]
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+
+from unittest.mock import patch
+
+import flask
+import honeybadger.connection as connection
+from celery import Celery
+from honeybadger.utils import StringReprJSONEncoder
+
+from honeybadger_extensions import HoneybadgerFlask, install_celery_handler, uninstall_celery_handler
+
+CONFIG = {
+    'HONEYBADGER_API_KEY': 'benchmark',
+    'HONEYBADGER_ENVIRONMENT': 'benchmark'
+}
+
+LARGE_HEADERS = {'X-Header-%d' % i: 'value-%d' % i * 8 for i in range(100)}
+LARGE_FORM = {'field_%d' % i: 'value %d' % i * 4 for i in range(200)}
+LARGE_ARGS = (list(range(1000)), )
+LARGE_KWARGS = {'items': [{'sku': 'SKU-%d' % i, 'quantity': i} for i in range(500)]}
+MANY_GENERATORS = {'generator_%d' % i: (lambda i=i: i) for i in range(50)}
+
+
+class FakeCollector(object):
+    """
+    Replaces honeybadger.connection.send_notice. Encodes notices like the real connection does and counts them.
+    """
+    def __init__(self):
+        self.notices = 0
+        self.bytes = 0
+
+    def __call__(self, config, payload):
+        self.notices += 1
+        self.bytes += len(connection.json.dumps(payload, cls=StringReprJSONEncoder))
+
+
+def _flask_client(with_extension, context_generators=None):
+    app = flask.Flask(__name__)
+    app.config.update(CONFIG)
+    if with_extension:
+        HoneybadgerFlask(app, report_exceptions=True, context_generators=context_generators or {})
+
+    @app.route('/ok', methods=['GET', 'POST'])
+    def ok():
+        return 'ok'
+
+    @app.route('/error', methods=['GET', 'POST'])
+    def error():
+        return 1 / 0
+
+    return app.test_client()
+
+
+def flask_success(with_extension):
+    client = _flask_client(with_extension)
+    return lambda: client.get('/ok?a=1&b=2')
+
+
+def flask_exception(with_extension):
+    client = _flask_client(with_extension)
+    return lambda: client.get('/error?a=1&b=2')
+
+
+def flask_large_request(with_extension):
+    client = _flask_client(with_extension)
+    return lambda: client.post('/error?a=1&b=2', headers=LARGE_HEADERS, data=LARGE_FORM)
+
+
+def flask_context_generators(with_extension):
+    client = _flask_client(with_extension, context_generators=MANY_GENERATORS)
+    return lambda: client.get('/error?a=1&b=2')
+
+
+def _celery_task(with_extension, context_generators=None):
+    app = Celery(__name__)
+    app.conf.CELERY_ALWAYS_EAGER = True
+    uninstall_celery_handler()
+    if with_extension:
+        install_celery_handler(CONFIG, context_generators=context_generators or {}, report_exceptions=True)
+
+    @app.task(name='benchmark_task')
+    def task(*args, **kwargs):
+        if kwargs.get('fail'):
+            raise ValueError('failed')
+        return len(args)
+
+    return task
+
+
+def celery_success(with_extension):
+    task = _celery_task(with_extension)
+    return lambda: task.apply_async(args=(1, 2))
+
+
+def celery_exception(with_extension):
+    task = _celery_task(with_extension)
+    return lambda: task.apply_async(args=(1, 2), kwargs={'fail': True})
+
+
+def celery_large_args(with_extension):
+    task = _celery_task(with_extension)
+    kwargs = dict(LARGE_KWARGS, fail=True)
+    return lambda: task.apply_async(args=LARGE_ARGS, kwargs=kwargs)
+
+
+def celery_context_generators(with_extension):
+    task = _celery_task(with_extension, context_generators=MANY_GENERATORS)
+    return lambda: task.apply_async(args=(1, 2), kwargs={'fail': True})
+
+
+SCENARIOS = [
+    ('flask-success', flask_success),
+    ('flask-exception', flask_exception),
+    ('flask-large-request', flask_large_request),
+    ('flask-context-generators', flask_context_generators),
+    ('celery-success', celery_success),
+    ('celery-exception', celery_exception),
+    ('celery-large-args', celery_large_args),
+    ('celery-context-generators', celery_context_generators),
+]
+
+
+def percentile(samples, p):
+    """
+    Returns the p-th percentile of sorted samples.
+    :param list[float] samples: the samples, sorted.
+    :param float p: the percentile, between 0 and 100.
+    :rtype: float
+    """
+    index = min(int(round(p / 100.0 * (len(samples) - 1))), len(samples) - 1)
+    return samples[index]
+
+
+def measure(operation, iterations):
+    """
+    Runs an operation, measuring its latency and allocations.
+    :param callable operation: the operation to run.
+    :param int iterations: how many times to run it.
+    :return: latencies in microseconds (sorted), bytes retained per operation and peak traced memory in bytes.
+    :rtype: tuple[list[float], float, int]
+    """
+    for _ in range(min(iterations, 50)):
+        operation()
+
+    gc.collect()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        operation()
+        latencies.append((time.perf_counter() - started) * 1e6)
+    latencies.sort()
+
+    # Allocations are measured separately, as tracing slows down the operation considerably.
+    allocation_runs = max(iterations // 10, 1)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        for _ in range(allocation_runs):
+            operation()
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return latencies, float(retained) / allocation_runs, peak
+
+
+def run(scenarios, iterations):
+    print('%-26s %-9s %9s %9s %9s %12s %10s %8s' % (
+        'scenario', 'variant', 'p50 us', 'p90 us', 'p99 us', 'retained B', 'peak KiB', 'notices'))
+    for name, factory in scenarios:
+        results = {}
+        for variant, with_extension in (('baseline', False), ('extension', True)):
+            collector = FakeCollector()
+            with patch('honeybadger.connection.send_notice', collector):
+                latencies, retained, peak = measure(factory(with_extension), iterations)
+            results[variant] = latencies
+            print('%-26s %-9s %9.1f %9.1f %9.1f %12.1f %10.1f %8d' % (
+                name, variant, percentile(latencies, 50), percentile(latencies, 90), percentile(latencies, 99),
+                retained, peak / 1024.0, collector.notices))
+        overhead = percentile(results['extension'], 50) - percentile(results['baseline'], 50)
+        print('%-26s %-9s %9.1f' % (name, 'overhead', overhead))
+    uninstall_celery_handler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--iterations', type=int, default=500, help='operations per scenario and variant')
+    parser.add_argument('scenarios', nargs='*', help='scenarios to run, all if omitted')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    scenarios = [(name, factory) for name, factory in SCENARIOS if not args.scenarios or name in args.scenarios]
+    run(scenarios, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
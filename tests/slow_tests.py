@@ -0,0 +1,98 @@
+import unittest
+import flask
+
+from unittest.mock import patch
+from celery import Celery
+
+from honeybadger_extensions import HoneybadgerFlask, install_celery_handler, uninstall_celery_handler
+from honeybadger_extensions.slow import SlowOperationMonitor
+
+
+class SlowOperationMonitorTestCase(unittest.TestCase):
+
+    def test_thresholds(self):
+        monitor = SlowOperationMonitor(thresholds={'slow': 1.0})
+
+        self.assertFalse(monitor.should_report('other', 100))
+        self.assertFalse(monitor.should_report('slow', 0.5))
+        self.assertTrue(monitor.should_report('slow', 1.5))
+
+    @patch('honeybadger_extensions.slow.monotonic')
+    def test_rate_limited(self, mock_monotonic):
+        monitor = SlowOperationMonitor(threshold=1.0, interval=60)
+
+        mock_monotonic.return_value = 100
+        self.assertTrue(monitor.should_report('slow', 2))
+        mock_monotonic.return_value = 130
+        self.assertFalse(monitor.should_report('slow', 2))
+        self.assertTrue(monitor.should_report('other', 2))
+        mock_monotonic.return_value = 161
+        self.assertTrue(monitor.should_report('slow', 2))
+
+
+class FlaskSlowRequestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = flask.Flask(__name__)
+        self.app.config.update({
+            'HONEYBADGER_ENVIRONMENT': 'production_flask',
+            'HONEYBADGER_SLOW_THRESHOLD': 0,
+            'HONEYBADGER_SLOW_THRESHOLDS': 'fast=1000'
+        })
+
+        @self.app.route('/slow')
+        def slow():
+            return 'slow'
+
+        @self.app.route('/fast')
+        def fast():
+            return 'fast'
+
+    @patch('honeybadger.connection.send_notice')
+    def test_reports_once(self, mock_send_notice):
+        HoneybadgerFlask(self.app, context_generators={'ringbearer': lambda: 'bilbo'})
+
+        client = self.app.test_client()
+        client.get('/slow')
+        client.get('/slow')
+
+        self.assertEqual(1, mock_send_notice.call_count)
+        notice = mock_send_notice.call_args[0][1]
+        self.assertEqual('SlowRequest', notice['error']['class'])
+        self.assertEqual('slow', notice['request']['action'])
+        self.assertEqual('bilbo', notice['request']['context']['ringbearer'])
+        self.assertEqual(0, notice['request']['context']['threshold'])
+
+    @patch('honeybadger.connection.send_notice')
+    def test_per_endpoint_threshold(self, mock_send_notice):
+        HoneybadgerFlask(self.app)
+
+        self.app.test_client().get('/fast')
+
+        mock_send_notice.assert_not_called()
+
+
+class CelerySlowTaskTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.celery = Celery(__name__)
+        self.celery.conf.CELERY_ALWAYS_EAGER = True
+
+    def tearDown(self):
+        uninstall_celery_handler()
+
+    @patch('honeybadger.connection.send_notice')
+    def test_reports_slow_task(self, mock_send_notice):
+        install_celery_handler({'HONEYBADGER_SLOW_THRESHOLDS': {'slow_task': 0}})
+
+        @self.celery.task(name='slow_task')
+        def slow_task(x):
+            return x
+
+        slow_task.apply_async(args=(1, ), task_id='abc')
+
+        self.assertEqual(1, mock_send_notice.call_count)
+        notice = mock_send_notice.call_args[0][1]
+        self.assertEqual('SlowTask', notice['error']['class'])
+        self.assertEqual('slow_task', notice['request']['action'])
+        self.assertEqual({'task_id': 'abc', 'retries': 0, 'max_retries': 3}, notice['request']['cgi_data'])
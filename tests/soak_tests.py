@@ -0,0 +1,161 @@
+"""
+Soak tests, driving many Flask requests and Celery tasks through the extensions, including repeated
+init_app/install/teardown cycles, and failing if memory or the number of live objects keeps growing.
+
+By default they run a few hundred iterations, as part of the test suite. For long soak runs, set the number of
+iterations, e.g.:
+
+    HONEYBADGER_SOAK_ITERATIONS=1000000 python -m pytest tests/soak_tests.py
+"""
+import gc
+import logging
+import os
+import tracemalloc
+import unittest
+import flask
+
+from unittest.mock import patch
+from celery import Celery
+from honeybadger import honeybadger
+
+from honeybadger_extensions import HoneybadgerFlask, install_celery_handler, uninstall_celery_handler
+
+ITERATIONS = int(os.environ.get('HONEYBADGER_SOAK_ITERATIONS', 200))
+MAX_GROWTH = int(os.environ.get('HONEYBADGER_SOAK_MAX_GROWTH', 256 * 1024))
+MAX_OBJECTS = int(os.environ.get('HONEYBADGER_SOAK_MAX_OBJECTS', 2000))
+WARMUP = 50
+
+CONFIG = {
+    'HONEYBADGER_API_KEY': 'soak',
+    'HONEYBADGER_ENVIRONMENT': 'soak'
+}
+
+
+class NullCollector(object):
+    """
+    Replaces honeybadger.connection.send_notice without keeping the notices, unlike a mock.
+    """
+    def __init__(self):
+        self.notices = 0
+
+    def __call__(self, config, payload):
+        self.notices += 1
+
+
+class SoakTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.collector = NullCollector()
+        patcher = patch('honeybadger.connection.send_notice', self.collector)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def tearDown(self):
+        uninstall_celery_handler()
+        honeybadger.reset_context()
+
+    def soak(self, operation, iterations=ITERATIONS):
+        """
+        Runs an operation repeatedly and fails if memory or the number of objects grew beyond the thresholds. Growth
+        is measured over the second half of the iterations only, once caches and interned tables filled up, so that
+        only growth that keeps going, i.e. leaks, is accounted for.
+        :param callable operation: the operation to run, accepting the number of the iteration.
+        :param int iterations: the number of iterations.
+        """
+        for i in range(WARMUP):
+            operation(i)
+
+        tracemalloc.start()
+        try:
+            for i in range(iterations // 2):
+                operation(i)
+            gc.collect()
+            before = tracemalloc.take_snapshot()
+            objects_before = len(gc.get_objects())
+            for i in range(iterations // 2, iterations):
+                operation(i)
+            gc.collect()
+            after = tracemalloc.take_snapshot()
+            objects_after = len(gc.get_objects())
+        finally:
+            tracemalloc.stop()
+
+        stats = after.compare_to(before, 'lineno')
+        growth = sum(stat.size_diff for stat in stats)
+        top = '\n'.join(str(stat) for stat in stats[:10])
+        self.assertLess(growth, MAX_GROWTH, msg='Memory grew by %d bytes, top allocations:\n%s' % (growth, top))
+        self.assertLess(objects_after - objects_before, MAX_OBJECTS,
+                        msg='Live objects grew by %d, top allocations:\n%s' % (objects_after - objects_before, top))
+
+    def _flask_app(self):
+        app = flask.Flask(__name__)
+        app.config.update(CONFIG)
+        extension = HoneybadgerFlask(app, report_exceptions=True, context_generators={
+            'request-id': lambda: flask.request.headers.get('X-Request-ID')
+        })
+
+        @app.route('/ok')
+        def ok():
+            extension.add_breadcrumb('ok')
+            honeybadger.set_context(user='bilbo')
+            return 'ok'
+
+        @app.route('/error', methods=['POST'])
+        def error():
+            extension.add_breadcrumb('failing')
+            return 1 / 0
+
+        return app
+
+    def _celery_task(self, app):
+        @app.task(name='soak_task')
+        def task(x, y=1):
+            honeybadger.set_context(x=x)
+            return x / y
+
+        return task
+
+    def _celery_app(self):
+        app = Celery(__name__)
+        app.conf.CELERY_ALWAYS_EAGER = True
+        return app
+
+    def test_flask_requests(self):
+        client = self._flask_app().test_client()
+
+        def operation(i):
+            client.get('/ok?i=%d' % i, headers={'X-Request-ID': str(i)})
+            client.post('/error', data={'password': 'secret', 'i': str(i)}, headers={'X-Request-ID': str(i)})
+
+        self.soak(operation)
+        self.assertGreater(self.collector.notices, ITERATIONS)
+
+    def test_flask_init_app_cycles(self):
+        def operation(i):
+            self._flask_app().test_client().post('/error', data={'i': str(i)})
+
+        self.soak(operation)
+
+    def test_celery_tasks(self):
+        install_celery_handler(CONFIG, context_generators={'ringbearer': lambda: 'frodo'}, report_exceptions=True)
+        task = self._celery_task(self._celery_app())
+
+        def operation(i):
+            task.apply_async(args=(i, ), kwargs={'y': 1})
+            task.apply_async(args=(i, ), kwargs={'y': 0})
+
+        self.soak(operation)
+        self.assertGreater(self.collector.notices, ITERATIONS)
+
+    def test_celery_install_cycles(self):
+        app = self._celery_app()
+        task = self._celery_task(app)
+
+        def operation(i):
+            install_celery_handler(CONFIG, report_exceptions=True)
+            task.apply_async(args=(i, ), kwargs={'y': 0})
+            uninstall_celery_handler()
+
+        self.soak(operation)
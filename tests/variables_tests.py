@@ -0,0 +1,179 @@
+import os
+import sys
+import time
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from celery import Celery
+from honeybadger.config import Configuration
+
+from honeybadger_extensions import install_celery_handler, uninstall_celery_handler
+from honeybadger_extensions.variables import LocalsCapture, is_application_file
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def checkout(order, password):
+    total = sum(order['items'])  # noqa: F841
+    discount = None  # noqa: F841
+    raise ValueError('payment declined')
+
+
+def process(orders):
+    count = len(orders)  # noqa: F841
+    return checkout(orders[0], 'hunter2')
+
+
+def traceback_of(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        return sys.exc_info()[2]
+
+
+class LocalsCaptureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.config = Configuration(project_root=PROJECT_ROOT, params_filters=['password', 'card'])
+        self.orders = [{'items': [1, 2, 3], 'card': '4111111111111111'}]
+
+    def label(self, function, lineno):
+        return '[PROJECT_ROOT]/tests/variables_tests.py:%d in %s' % (lineno, function.__name__)
+
+    def test_capture(self):
+        captured = LocalsCapture(frames=2).capture(traceback_of(process, self.orders), self.config)
+
+        checkout_locals = captured[self.label(checkout, checkout.__code__.co_firstlineno + 3)]
+        self.assertEqual('[FILTERED]', checkout_locals['password'])
+        self.assertEqual("{'items': [1, 2, 3], 'card': [FILTERED]}", checkout_locals['order'])
+        self.assertEqual('6', checkout_locals['total'])
+        self.assertEqual('None', checkout_locals['discount'])
+        process_locals = captured[self.label(process, process.__code__.co_firstlineno + 2)]
+        self.assertEqual({'orders', 'count'}, set(process_locals))
+        self.assertEqual(2, len(captured))
+
+    def test_frames_limit(self):
+        captured = LocalsCapture(frames=1).capture(traceback_of(process, self.orders), self.config)
+
+        self.assertEqual([self.label(checkout, checkout.__code__.co_firstlineno + 3)], list(captured))
+
+    def test_value_budget(self):
+        orders = [{'items': list(range(10000))}]
+
+        captured = LocalsCapture(frames=2, max_value=20).capture(traceback_of(process, orders), self.config)
+
+        for variables in captured.values():
+            for value in variables.values():
+                self.assertLessEqual(len(value), 20)
+
+    def test_total_budget(self):
+        captured = LocalsCapture(frames=2, max_total=30).capture(traceback_of(process, self.orders), self.config)
+
+        self.assertLessEqual(sum(len(k) + len(v) for values in captured.values() for k, v in values.items()), 30)
+
+    @patch('honeybadger_extensions.variables.perf_counter')
+    def test_time_budget(self, mock_perf_counter):
+        mock_perf_counter.side_effect = [0.0, 0.001, 0.002, 1.0]
+
+        capture = LocalsCapture(frames=2, time_budget=0.005)
+        captured = capture.capture(traceback_of(process, self.orders), self.config)
+
+        self.assertEqual(2, sum(len(variables) for variables in captured.values()))
+
+    def test_unrepresentable_value(self):
+        class Broken(object):
+            def __repr__(self):
+                raise RuntimeError('no repr')
+
+        def fail(value):
+            raise ValueError()
+
+        captured = LocalsCapture(frames=1, full_repr=True).capture(traceback_of(fail, Broken()), self.config)
+
+        self.assertEqual('<Broken instance>', list(captured.values())[0]['value'])
+
+    def test_objects_not_repr_by_default(self):
+        calls = []
+
+        class Huge(object):
+            def __repr__(self):
+                calls.append(self)
+                time.sleep(0.5)
+                return 'x' * 10000000
+
+        def fail(value, created, amount, data):
+            raise ValueError()
+
+        started = time.time()
+        captured = LocalsCapture(frames=1).capture(
+            traceback_of(fail, Huge(), datetime(2020, 1, 2), Decimal('1.5'), b'\x00' * 10000000), self.config)
+
+        self.assertLess(time.time() - started, 0.1)
+        self.assertEqual([], calls)
+        variables = list(captured.values())[0]
+        self.assertEqual('<tests.variables_tests.Huge object>', variables['value'])
+        self.assertEqual('datetime.datetime(2020, 1, 2, 0, 0)', variables['created'])
+        self.assertEqual("Decimal('1.5')", variables['amount'])
+        self.assertLessEqual(len(variables['data']), 256)
+
+    def test_full_repr(self):
+        class Named(object):
+            def __repr__(self):
+                return 'Named(%s)' % ('x' * 1000)
+
+        def fail(value):
+            raise ValueError()
+
+        captured = LocalsCapture(frames=1, full_repr=True).capture(traceback_of(fail, Named()), self.config)
+
+        value = list(captured.values())[0]['value']
+        self.assertTrue(value.startswith('Named(xxx'))
+        self.assertEqual(256, len(value))
+
+    def test_application_files(self):
+        self.assertTrue(is_application_file(os.path.join(PROJECT_ROOT, 'tests', 'module.py'), PROJECT_ROOT))
+        self.assertFalse(is_application_file(os.path.join(PROJECT_ROOT, 'venv', 'lib', 'site-packages', 'flask.py'),
+                                             PROJECT_ROOT))
+        self.assertFalse(is_application_file(os.path.join(PROJECT_ROOT, 'honeybadger_extensions', 'base.py'),
+                                             PROJECT_ROOT))
+        self.assertFalse(is_application_file('/usr/lib/python3/json/__init__.py', PROJECT_ROOT))
+
+
+class CeleryLocalsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.celery = Celery(__name__)
+        self.celery.conf.CELERY_ALWAYS_EAGER = True
+
+    def tearDown(self):
+        uninstall_celery_handler()
+
+    @patch('honeybadger.connection.send_notice')
+    def test_capture_enabled(self, mock_send_notice):
+        install_celery_handler({'HONEYBADGER_API_KEY': 'key', 'HONEYBADGER_ENVIRONMENT': 'celery_test',
+                                'HONEYBADGER_CAPTURE_LOCALS': 1}, report_exceptions=True)
+
+        @self.celery.task
+        def divide(x, y=1):
+            ratio = 'x/y'  # noqa: F841
+            return x / y
+
+        divide.apply_async(args=(1, ), kwargs={'y': 0})
+
+        local_variables = mock_send_notice.call_args[0][1]['request']['local_variables']
+        self.assertEqual(1, len(local_variables))
+        self.assertEqual({'x': '1', 'y': '0', 'ratio': "'x/y'"}, list(local_variables.values())[0])
+
+    @patch('honeybadger.connection.send_notice')
+    def test_capture_disabled(self, mock_send_notice):
+        install_celery_handler({'HONEYBADGER_API_KEY': 'key', 'HONEYBADGER_ENVIRONMENT': 'celery_test'},
+                               report_exceptions=True)
+
+        @self.celery.task
+        def divide(x, y=1):
+            return x / y
+
+        divide.apply_async(args=(1, ), kwargs={'y': 0})
+
+        self.assertNotIn('local_variables', mock_send_notice.call_args[0][1]['request'])